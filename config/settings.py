@@ -43,6 +43,10 @@ class Settings(BaseSettings):
     visit_server_timeout: int = Field(default=200, env="VISIT_SERVER_TIMEOUT")
     webcontent_maxlength: int = Field(default=150000, env="WEBCONTENT_MAXLENGTH")
     allow_local_python: bool = Field(default=True, env="ALLOW_LOCAL_PYTHON")
+    # 单工具实例同时在途的搜索/网页抓取上限 (防止大批量 fanout 触发限流)
+    max_concurrent_fetches: int = Field(default=8, env="MAX_CONCURRENT_FETCHES")
+    # 语义缓存嵌入模型精度: int8 动态量化约 2-3x 吞吐, fp32 为精确回退
+    embed_dtype: str = Field(default="int8", env="EMBED_DTYPE")
     
     # ==========================================================================
     # Server Configuration
@@ -16,6 +16,12 @@ from src.agent.intent_classifier import IntentClassifier
 from src.utils.logger import logger
 from src.utils.session_manager import SessionManager
 
+# 每轮响应要做多次的标签匹配, 模块级预编译省去每次调用的
+# 模式查找/重建 (标签字面量与类常量保持一致)
+_THINK_RE = re.compile(r"<think>(.*?)</think>", re.DOTALL)
+_TOOL_CALL_RE = re.compile(r"<tool_call>(.*?)</tool_call>", re.DOTALL)
+_CODE_RE = re.compile(r"<code>(.*?)</code>", re.DOTALL)
+
 
 @dataclass
 class ResearchResult:
@@ -189,10 +195,11 @@ class xSmartReactAgent:
             intent_category=category,
             project_id=project_id or self.current_project_id
         )
-        # 记录用户问题
-        await asyncio.to_thread(self.session_manager.add_message, session_id, "user", question)
-        # PERSIST: Delayed status messages
-        await asyncio.to_thread(self.session_manager.add_message, session_id, "status", status_msg)
+        # 记录用户问题与延迟的状态消息 (批量一次写入)
+        await asyncio.to_thread(
+            self.session_manager.add_messages, session_id,
+            [("user", question, None), ("status", status_msg, None)]
+        )
 
         # 构建初始消息
         tool_definitions = [tool.get_function_definition() for tool in self.tools.values()]
@@ -226,7 +233,7 @@ class xSmartReactAgent:
             
             # 提取思考过程
             if self.THINK_START in response:
-                think_match = re.search(f"{re.escape(self.THINK_START)}(.*?){re.escape(self.THINK_END)}", response, re.DOTALL)
+                think_match = _THINK_RE.search(response)
                 if think_match:
                     think_content = think_match.group(1).strip()
                 else:
@@ -297,27 +304,22 @@ class xSmartReactAgent:
                     
                     # 3. 处理结果并反馈
                     combined_tool_outputs = []
-                    
+                    persist_rows = []
+
                     for i, result in enumerate(results):
                         tool_name = tool_names[i]
-                        
-                        # 记录工具调用的详细信息
-                        await asyncio.to_thread(
-                            self.session_manager.add_message,
-                            session_id, 
-                            "tool", 
-                            f"Call: {tool_name}\nResult Length: {len(str(result))}",
-                            metadata={"tool_name": tool_name}
-                        )
 
-                        # PERSIST: tool_response
-                        await asyncio.to_thread(
-                            self.session_manager.add_message,
-                            session_id,
+                        # 攒批: 本轮所有工具记录在循环后一次性落库
+                        persist_rows.append((
+                            "tool",
+                            f"Call: {tool_name}\nResult Length: {len(str(result))}",
+                            {"tool_name": tool_name}
+                        ))
+                        persist_rows.append((
                             "tool_response",
                             result,
-                            metadata={"tool_name": tool_name}
-                        )
+                            {"tool_name": tool_name}
+                        ))
 
                         yield {
                             "type": "tool_response", 
@@ -328,6 +330,11 @@ class xSmartReactAgent:
                         
                         combined_tool_outputs.append(f"Tool '{tool_name}' Output:\n{result}")
 
+                    # 本轮工具记录整批落库 (一次 executemany + 一次 commit)
+                    await asyncio.to_thread(
+                        self.session_manager.add_messages, session_id, persist_rows
+                    )
+
                     # 将所有结果合并为一个 User Message 反馈给 LLM
                     # 这样 LLM 可以一次性看到所有并行执行的结果
                     full_response_content = "\n\n".join(combined_tool_outputs)
@@ -422,21 +429,24 @@ class xSmartReactAgent:
     
     def _extract_answer(self, content: str) -> str:
         """从响应内容中提取最终答案"""
-        # 尝试匹配闭合标签
-        match = re.search(f"{re.escape(self.ANSWER_START)}(.*?){re.escape(self.ANSWER_END)}", content, re.DOTALL)
-        if match:
-            return match.group(1).strip()
-        
-        # 容错：尝试匹配未闭合的开始标签
-        if self.ANSWER_START in content:
-            return content.split(self.ANSWER_START)[-1].strip()
-            
-        return content.strip()
+        # 固定标签用 find 定位即可, 不必进正则引擎
+        start = content.find(self.ANSWER_START)
+        if start < 0:
+            return content.strip()
+
+        start += len(self.ANSWER_START)
+        end = content.find(self.ANSWER_END, start)
+        if end >= 0:
+            return content[start:end].strip()
+
+        # 容错：未闭合的开始标签, 取最后一个标签之后的内容
+        last = content.rfind(self.ANSWER_START)
+        return content[last + len(self.ANSWER_START):].strip()
     
     def _has_tool_call(self, content: str) -> bool:
         """检查内容中是否包含工具调用"""
-        return bool(re.search(r'<tool_call>.*?</tool_call>', content, re.DOTALL)) or \
-               bool(re.search(r'<tool_call>.*', content, re.DOTALL)) # 容错：允许未闭合标签
+        # C 层子串查找即可: 闭合与未闭合标签都以开始标签为准
+        return self.TOOL_CALL_START in content
     
     def _extract_tool_calls(self, content: str) -> List[Dict[str, Any]]:
         """从响应中提取所有工具调用"""
@@ -445,8 +455,7 @@ class xSmartReactAgent:
         # 匹配所有 <tool_call>...</tool_call> 块
         # 使用非贪婪匹配，并尽量匹配闭合标签
         # 如果有多个不带换行符的 tool_call，正则可能需要调整，但通常 LLM 会换行
-        pattern = r'<tool_call>(.*?)</tool_call>'
-        matches = re.finditer(pattern, content, re.DOTALL)
+        matches = _TOOL_CALL_RE.finditer(content)
         
         for match in matches:
             tool_call_str = match.group(1).strip()
@@ -504,7 +513,7 @@ class xSmartReactAgent:
              # 如果没有，则添加一个隐式的 PythonInterpreter 调用
              has_pi = any(tc['name'] == 'PythonInterpreter' for tc in tool_calls)
              if not has_pi:
-                 code_match = re.search(f"{re.escape(self.CODE_START)}(.*?){re.escape(self.CODE_END)}", content, re.DOTALL)
+                 code_match = _CODE_RE.search(content)
                  if code_match:
                      code_content = code_match.group(1).strip()
                      tool_calls.append({
@@ -1,11 +1,18 @@
 """API 依赖项"""
 
-from functools import lru_cache
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from typing import Dict, Any
 
+import httpx
 from openai import AsyncOpenAI
 
 from config import settings
+from src.utils.logger import logger
 from src.agent import xSmartReactAgent
 from src.tools import SearchTool, VisitTool, PythonInterpreterTool, ScholarTool, FileParserTool
 
@@ -14,12 +21,26 @@ from src.tools import SearchTool, VisitTool, PythonInterpreterTool, ScholarTool,
 _agent_instance = None
 
 
+@lru_cache()
+def get_http_client() -> httpx.AsyncClient:
+    """获取共享 HTTP 客户端单例 (keep-alive 连接池)
+
+    所有 LLM 出站调用复用同一连接池，避免每次请求重建 TCP+TLS 连接。
+    在应用 shutdown 时关闭。
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=30.0
+    )
+
+
 @lru_cache()
 def get_openai_client() -> AsyncOpenAI:
     """获取 OpenAI 客户端单例"""
     return AsyncOpenAI(
         api_key=settings.openrouter_key or settings.api_key,
         base_url=settings.api_base,
+        http_client=get_http_client(),
         timeout=600.0,
         default_headers={
             "HTTP-Referer": "https://github.com/sxm1129/DeepResearch",
@@ -34,6 +55,7 @@ def get_summary_client() -> AsyncOpenAI:
     return AsyncOpenAI(
         api_key=settings.openrouter_key or settings.api_key,
         base_url=settings.api_base,
+        http_client=get_http_client(),
         timeout=60.0
     )
 
@@ -89,10 +111,20 @@ def get_available_tools() -> list:
     return tools
 
 
+# 内存任务存储: 有界 LRU, 防止常驻进程下无限增长
+_TASK_STORE_MAX_SIZE = 10_000
+_task_store: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
 def get_task_store() -> Dict[str, Any]:
-    """获取任务存储（简单实现）"""
-    # 生产环境应该使用 Redis
-    return {}
+    """获取任务存储（简单实现）
+
+    生产路径已迁移到 MySQL (SessionManager)；此存储仅作为内存兜底，
+    超过 _TASK_STORE_MAX_SIZE 时按 LRU 淘汰最旧条目。
+    """
+    while len(_task_store) > _TASK_STORE_MAX_SIZE:
+        _task_store.popitem(last=False)
+    return _task_store
 
 from src.utils.session_manager import SessionManager
 
@@ -100,3 +132,93 @@ from src.utils.session_manager import SessionManager
 def get_session_manager() -> SessionManager:
     """获取 SessionManager 单例"""
     return SessionManager()
+
+
+# 专用 DB 线程池: asyncio.to_thread 走进程共享的默认执行器,
+# 高并发下数据库调用会与其他阻塞任务争抢线程; 改走有界专用池
+_db_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="db-worker")
+
+
+async def run_db(func, *args, **kwargs):
+    """在专用 DB 线程池中执行阻塞的数据库调用"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, partial(func, *args, **kwargs))
+
+
+# 研究任务工作队列: 常驻 worker 消费, 取代 BackgroundTasks 的"响应后就地执行"。
+# 有界并发使批量提交不会同时拉起无限多个 Agent 运行。
+RESEARCH_WORKER_COUNT = 4
+_research_queue: "asyncio.Queue" = asyncio.Queue()
+_research_workers: list = []
+
+
+async def _research_worker():
+    """常驻研究 worker: 循环消费队列中的 (协程函数, 参数) 并执行"""
+    while True:
+        func, args = await _research_queue.get()
+        try:
+            await func(*args)
+        except Exception as e:
+            logger.error(f"Research worker task failed: {e}")
+        finally:
+            _research_queue.task_done()
+
+
+def start_research_workers():
+    """在应用启动时拉起常驻研究 worker"""
+    if _research_workers:
+        return
+    for _ in range(RESEARCH_WORKER_COUNT):
+        _research_workers.append(asyncio.create_task(_research_worker()))
+
+
+async def stop_research_workers():
+    """在应用关闭时取消所有研究 worker"""
+    for worker in _research_workers:
+        worker.cancel()
+    _research_workers.clear()
+
+
+async def enqueue_research(func, *args):
+    """把研究任务投递到常驻 worker 队列"""
+    await _research_queue.put((func, args))
+
+
+def async_memoize(ttl_ms: int):
+    """短 TTL 异步记忆化装饰器: 合并并发的相同调用
+
+    首个调用者创建 Future 并执行; TTL 内 (或仍在执行中) 的相同调用
+    共享同一个 Future, 把 N 个并发相同查询折叠成 1 次 DB 访问。
+    适合轮询型只读端点, 不要用于写路径。
+    """
+    def decorator(func):
+        cache: Dict[tuple, tuple] = {}  # key -> (expires_at, future)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            entry = cache.get(key)
+            if entry is not None and (not entry[1].done() or now < entry[0]):
+                return await asyncio.shield(entry[1])
+
+            if len(cache) > 1024:
+                for stale_key in [k for k, v in cache.items() if v[1].done() and now >= v[0]]:
+                    del cache[stale_key]
+
+            future = asyncio.get_running_loop().create_future()
+            cache[key] = (now + ttl_ms / 1000.0, future)
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+                # 无并发等待者时异常会从未被取回, GC 时 asyncio 告警;
+                # 这里主动取回一次, 等待者仍能正常拿到异常
+                future.exception()
+                cache.pop(key, None)
+                raise
+            future.set_result(result)
+            return result
+
+        return wrapper
+    return decorator
@@ -13,7 +13,7 @@ load_dotenv()
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 
 from config import settings
 from src.api.schemas import HealthCheck
@@ -71,11 +71,29 @@ async def lifespan(app: FastAPI):
 
     logger.info(f"Model: {settings.model_name}")
     logger.info(f"Tools: {get_available_tools()}")
-    
+
+    # 缓存连接健康检查 (失败时在此一次性禁用, 不影响启动)
+    from src.utils.cache import cache_manager
+    await cache_manager.ping()
+
+    # 拉起常驻研究 worker
+    from src.api.dependencies import start_research_workers, stop_research_workers
+    start_research_workers()
+
+    # 启动期构建的单例/连接池等长寿对象冻结进永久代, 后续 GC 不再扫描
+    import gc
+    gc.freeze()
+
     yield
-    
+
     # 关闭时
     logger.info("xSmartDeepResearch API shutting down...")
+    await stop_research_workers()
+    from src.api.dependencies import get_http_client
+    await get_http_client().aclose()
+    from src.utils.http_session import close_aiohttp_session
+    await close_aiohttp_session()
+    await cache_manager.aclose()
 
 
 # 创建应用
@@ -99,7 +117,8 @@ app = FastAPI(
     version=APP_VERSION,
     lifespan=lifespan,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS 配置
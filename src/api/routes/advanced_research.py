@@ -1,6 +1,6 @@
 """高级研究 API 路由 - 意图澄清 + 深度研究 (完全独立于现有 research 路由)"""
 
-import uuid
+import secrets
 import asyncio
 import json
 from typing import Optional
@@ -8,6 +8,7 @@ from typing import Optional
 from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 
+from config import settings
 from src.api.schemas.advanced_research import (
     ClarifyRequest,
     ClarifyResponse,
@@ -15,7 +16,8 @@ from src.api.schemas.advanced_research import (
     AdvancedResearchRequest
 )
 from src.utils.logger import logger
-from src.api.dependencies import get_agent, get_session_manager
+from src.api.dependencies import get_agent, get_session_manager, run_db
+from src.api.routes.research import _sse_frame, _SSE_KEEPALIVE
 from src.api.schemas import ResearchStatus
 
 
@@ -30,7 +32,6 @@ def _get_clarifier():
     """获取 IntentClarifier 单例 (复用 dependencies 中的 client，避免资源泄漏)"""
     global _clarifier_instance
     if _clarifier_instance is None:
-        from config import settings
         from src.agent.intent_clarifier import IntentClarifier
         from src.api.dependencies import get_openai_client
         
@@ -131,10 +132,9 @@ async def stream_advanced_research(
     
     async def event_generator():
         agent = get_agent()
-        from config import settings
         effective_max_iterations = research_request.max_iterations or settings.max_llm_call_per_run
         
-        task_id = str(uuid.uuid4())[:8]
+        task_id = secrets.token_hex(4)
         queue = asyncio.Queue()
         done_event = asyncio.Event()
         
@@ -145,12 +145,22 @@ async def stream_advanced_research(
                     await asyncio.wait_for(done_event.wait(), timeout=15)
                     break
                 except asyncio.TimeoutError:
-                    await queue.put(": keepalive\n\n")
-        
+                    await queue.put(_SSE_KEEPALIVE)
+
+        async def disconnect_watcher():
+            """等待 ASGI http.disconnect, 断开时取消研究任务而非等下一个事件"""
+            while not done_event.is_set():
+                message = await request.receive()
+                if message["type"] == "http.disconnect":
+                    logger.info("Client disconnected, stopping advanced research stream.")
+                    break
+            done_event.set()
+            await queue.put(None)
+
         async def research_task():
             """执行研究并将事件推入队列"""
             try:
-                await asyncio.to_thread(
+                await run_db(
                     session_manager.create_research_task,
                     task_id=task_id,
                     question=research_request.original_question,
@@ -160,18 +170,14 @@ async def stream_advanced_research(
                 final_answer_data = None
                 
                 # 发送任务创建事件，附带原始问题和精炼查询
-                await queue.put(f"data: {json.dumps({'type': 'task_created', 'content': 'Advanced research initiated', 'task_id': task_id, 'original_question': research_request.original_question, 'refined_query': research_request.refined_query}, ensure_ascii=False)}\n\n")
+                await queue.put(_sse_frame({'type': 'task_created', 'content': 'Advanced research initiated', 'task_id': task_id, 'original_question': research_request.original_question, 'refined_query': research_request.refined_query}))
                 
                 # 使用精炼后的查询调用现有 Agent
                 async for event in agent.stream_run(research_request.refined_query, max_iterations=effective_max_iterations):
-                    if await request.is_disconnected():
-                        logger.info("Client disconnected, stopping advanced research stream.")
-                        break
-                    
                     if isinstance(event, dict) and event.get("type") == "final_answer":
                         final_answer_data = event
                     
-                    await queue.put(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+                    await queue.put(_sse_frame(event))
                 
                 # 更新任务状态
                 update_data = {"status": ResearchStatus.COMPLETED}
@@ -182,23 +188,24 @@ async def stream_advanced_research(
                         "termination_reason": final_answer_data.get("termination", "answer")
                     })
                 
-                await asyncio.to_thread(session_manager.update_research_task, task_id, update_data)
+                await run_db(session_manager.update_research_task, task_id, update_data)
                 
             except Exception as e:
                 logger.error(f"Advanced research stream failed: {e}")
-                await asyncio.to_thread(session_manager.update_research_task, task_id, {
+                await run_db(session_manager.update_research_task, task_id, {
                     "status": ResearchStatus.FAILED,
                     "termination_reason": str(e)
                 })
-                await queue.put(f"data: {json.dumps({'type': 'error', 'content': str(e)}, ensure_ascii=False)}\n\n")
+                await queue.put(_sse_frame({'type': 'error', 'content': str(e)}))
             finally:
                 done_event.set()
                 await queue.put(None)
         
         # Start tasks
         heartbeat = asyncio.create_task(heartbeat_task())
+        watcher = asyncio.create_task(disconnect_watcher())
         research = asyncio.create_task(research_task())
-        
+
         try:
             while True:
                 item = await queue.get()
@@ -208,6 +215,7 @@ async def stream_advanced_research(
         finally:
             done_event.set()
             heartbeat.cancel()
+            watcher.cancel()
             if not research.done():
                 research.cancel()
     
@@ -1,5 +1,8 @@
 """健康监控路由"""
 
+import asyncio
+import time
+
 from fastapi import APIRouter, Response, status
 
 from src.api.schemas import HealthCheckDetail, ComponentHealth
@@ -12,6 +15,11 @@ from src.utils.health import (
 
 router = APIRouter(tags=["System"])
 
+# 健康检查结果短 TTL 缓存: 吸收 K8s/LB 高频探测, 避免每次都打穿到 MySQL/Redis
+# 只缓存成功结果, 失败直接透传以便恢复后立即反映
+_HEALTH_CACHE_TTL = 2.0
+_health_cache: dict = {"result": None, "expires_at": 0.0}
+
 
 @router.get("/health", response_model=HealthCheckDetail)
 async def health_check(response: Response):
@@ -40,11 +48,24 @@ async def health_check(response: Response):
     }
     ```
     """
-    # 检查所有组件
-    db_result = await check_mysql_connection()
-    disk_result = await check_disk_space()
-    redis_result = await check_redis_connection()
-    
+    # 命中短 TTL 缓存时直接返回, 吸收探测洪峰
+    if _health_cache["result"] is not None and time.monotonic() < _health_cache["expires_at"]:
+        return _health_cache["result"]
+
+    # 并发检查所有组件, 总延迟取决于最慢的探测而非各项之和
+    # 单项探测加 2 秒超时, 防止某个挂起的探测拖垮整个接口
+    async def _probe(check, name: str):
+        try:
+            return await asyncio.wait_for(check(), timeout=2.0)
+        except Exception as e:
+            return {"result": "fail", "message": f"{name} check failed: {str(e)}"}
+
+    db_result, disk_result, redis_result = await asyncio.gather(
+        _probe(check_mysql_connection, "MySQL"),
+        _probe(check_disk_space, "Disk"),
+        _probe(check_redis_connection, "Redis")
+    )
+
     # 转换为 Pydantic 模型
     db_health = ComponentHealth(**db_result)
     disk_health = ComponentHealth(**disk_result)
@@ -69,9 +90,15 @@ async def health_check(response: Response):
     # 设置响应状态码
     if not all_systems_go:
         response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
-    
-    return HealthCheckDetail(
+
+    result = HealthCheckDetail(
         result="succeed" if all_systems_go else "fail",
         timestamp=get_current_timestamp(),
         details=details
     )
+
+    if all_systems_go:
+        _health_cache["result"] = result
+        _health_cache["expires_at"] = time.monotonic() + _HEALTH_CACHE_TTL
+
+    return result
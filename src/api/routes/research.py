@@ -1,17 +1,19 @@
 """研究 API 路由"""
 
-import uuid
+import secrets
 import asyncio
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
 import httpx
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from fastapi.responses import StreamingResponse
 import json
 
+from config import settings
 from src.api.schemas import (
-    ResearchRequest, 
+    ResearchRequest,
     ResearchResponse, 
     ResearchStatus,
     TaskStatus,
@@ -20,11 +22,21 @@ from src.api.schemas import (
 )
 from typing import List
 from src.utils.logger import logger
-from src.api.dependencies import get_agent, get_task_store
+from src.api.dependencies import get_agent, get_task_store, run_db, async_memoize, enqueue_research
 
 
 router = APIRouter(prefix="/research", tags=["Research"])
 
+# SSE 帧模板: 预编码字节常量, 避免每个事件的 f-string 格式化与 str→bytes 转换
+_SSE_DATA_PREFIX = b"data: "
+_SSE_FRAME_END = b"\n\n"
+_SSE_KEEPALIVE = b": keepalive\n\n"
+
+
+def _sse_frame(event: dict) -> bytes:
+    """将事件编码为单个 SSE data 帧 (orjson C 扩展编码, 原生输出 UTF-8 字节)"""
+    return _SSE_DATA_PREFIX + orjson.dumps(event) + _SSE_FRAME_END
+
 
 from src.utils.session_manager import SessionManager
 from src.api.dependencies import get_session_manager
@@ -36,8 +48,8 @@ from src.api.dependencies import get_session_manager
 async def stream_research(
     request: Request,
     research_request: ResearchRequest,
+    session_manager: SessionManager = Depends(get_session_manager),
 ):
-    session_manager = get_session_manager()
     """
     流式执行研究任务 (SSE)
     
@@ -46,10 +58,9 @@ async def stream_research(
     """
     async def event_generator():
         agent = get_agent()
-        from config import settings
         effective_max_iterations = research_request.max_iterations or settings.max_llm_call_per_run
         
-        task_id = str(uuid.uuid4())[:8]
+        task_id = secrets.token_hex(4)
         queue = asyncio.Queue()
         done_event = asyncio.Event()
         
@@ -60,12 +71,22 @@ async def stream_research(
                     await asyncio.wait_for(done_event.wait(), timeout=15)
                     break  # done_event was set
                 except asyncio.TimeoutError:
-                    await queue.put(": keepalive\n\n")
-        
+                    await queue.put(_SSE_KEEPALIVE)
+
+        async def disconnect_watcher():
+            """等待 ASGI http.disconnect: 单次 await 替代逐事件轮询, 断开立即终止研究"""
+            while not done_event.is_set():
+                message = await request.receive()
+                if message["type"] == "http.disconnect":
+                    logger.info("Client disconnected, stopping research stream.")
+                    break
+            done_event.set()
+            await queue.put(None)
+
         async def research_task():
             """执行研究并将事件推入队列"""
             try:
-                await asyncio.to_thread(
+                await run_db(
                     session_manager.create_research_task,
                     task_id=task_id,
                     question=research_request.question,
@@ -74,17 +95,13 @@ async def stream_research(
 
                 final_answer_data = None
                 
-                await queue.put(f"data: {json.dumps({'type': 'task_created', 'content': 'Task initiated', 'task_id': task_id}, ensure_ascii=False)}\n\n")
+                await queue.put(_sse_frame({'type': 'task_created', 'content': 'Task initiated', 'task_id': task_id}))
                 
                 async for event in agent.stream_run(research_request.question, max_iterations=effective_max_iterations):
-                    if await request.is_disconnected():
-                        logger.info("Client disconnected, stopping research stream.")
-                        break
-                    
                     if isinstance(event, dict) and event.get("type") == "final_answer":
                         final_answer_data = event
                     
-                    await queue.put(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+                    await queue.put(_sse_frame(event))
                 
                 # Update task on completion
                 update_data = {"status": ResearchStatus.COMPLETED}
@@ -95,23 +112,24 @@ async def stream_research(
                         "termination_reason": final_answer_data.get("termination", "answer")
                     })
                 
-                await asyncio.to_thread(session_manager.update_research_task, task_id, update_data)
+                await run_db(session_manager.update_research_task, task_id, update_data)
 
             except Exception as e:
                 logger.error(f"Stream research failed: {e}")
-                await asyncio.to_thread(session_manager.update_research_task, task_id, {
+                await run_db(session_manager.update_research_task, task_id, {
                     "status": ResearchStatus.FAILED,
                     "termination_reason": str(e)
                 })
-                await queue.put(f"data: {json.dumps({'type': 'error', 'content': str(e)}, ensure_ascii=False)}\n\n")
+                await queue.put(_sse_frame({'type': 'error', 'content': str(e)}))
             finally:
                 done_event.set()
                 await queue.put(None)  # Sentinel to stop yielding
         
-        # Start both tasks
+        # Start all tasks
         heartbeat = asyncio.create_task(heartbeat_task())
+        watcher = asyncio.create_task(disconnect_watcher())
         research = asyncio.create_task(research_task())
-        
+
         try:
             while True:
                 item = await queue.get()
@@ -121,6 +139,7 @@ async def stream_research(
         finally:
             done_event.set()
             heartbeat.cancel()
+            watcher.cancel()
             if not research.done():
                 research.cancel()
 
@@ -145,11 +164,10 @@ async def create_research(
     
     同步执行研究任务并返回结果。对于长时间任务，考虑使用 /research/async 端点。
     """
-    task_id = str(uuid.uuid4())[:8]
+    task_id = secrets.token_hex(4)
     
     try:
         agent = get_agent()
-        from config import settings
         effective_max_iterations = request.max_iterations or settings.max_llm_call_per_run
         
         # 执行研究
@@ -173,30 +191,25 @@ async def create_research(
 @router.post("/async", response_model=TaskStatus)
 async def create_async_research(
     request: ResearchRequest,
-    background_tasks: BackgroundTasks
+    session_manager: SessionManager = Depends(get_session_manager),
 ):
     """
     创建异步研究任务
     
     立即返回任务ID，后台执行研究。使用 GET /research/{task_id} 查询结果。
     """
-    task_id = str(uuid.uuid4())[:8]
-    
+    task_id = secrets.token_hex(4)
+
     # 初始化任务状态 (MySQL)
-    session_manager = get_session_manager()
-    await asyncio.to_thread(
+    await run_db(
         session_manager.create_research_task,
         task_id=task_id,
         question=request.question,
         status=ResearchStatus.PENDING
     )
     
-    # 在后台执行研究
-    background_tasks.add_task(
-        _run_research_task,
-        task_id,
-        request
-    )
+    # 投递到常驻研究 worker 队列
+    await enqueue_research(_run_research_task, task_id, request)
     
     return TaskStatus(
         task_id=task_id,
@@ -231,8 +244,8 @@ async def _dispatch_webhook(
     }
     
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            await client.post(callback_url, json=payload)
+        from src.api.dependencies import get_http_client
+        await get_http_client().post(callback_url, json=payload, timeout=10)
     except Exception as e:
         logger.warning(f"Webhook dispatch to {callback_url} failed: {e}")
 
@@ -244,10 +257,9 @@ async def _run_research_task(task_id: str, request: ResearchRequest):
     callback_events = request.callback_events
     
     try:
-        await asyncio.to_thread(session_manager.update_research_task, task_id, {"status": ResearchStatus.RUNNING})
+        await run_db(session_manager.update_research_task, task_id, {"status": ResearchStatus.RUNNING})
         
         agent = get_agent()
-        from config import settings
         effective_max_iterations = request.max_iterations or settings.max_llm_call_per_run
         
         # 使用 stream_run 消费事件, 支持 webhook 回调
@@ -271,7 +283,7 @@ async def _run_research_task(task_id: str, request: ResearchRequest):
                 "execution_time": 0,
                 "termination_reason": final_answer_data.get("termination", "answer")
             })
-        await asyncio.to_thread(session_manager.update_research_task, task_id, update_data)
+        await run_db(session_manager.update_research_task, task_id, update_data)
         
     except Exception as e:
         # 错误也回调通知
@@ -280,7 +292,7 @@ async def _run_research_task(task_id: str, request: ResearchRequest):
                 "task_id": task_id, "type": "error", "content": str(e)
             }, callback_events)
         
-        await asyncio.to_thread(session_manager.update_research_task, task_id, {
+        await run_db(session_manager.update_research_task, task_id, {
             "status": ResearchStatus.FAILED,
             "answer": f"Error: {str(e)}",
             "termination_reason": "error"
@@ -288,13 +300,15 @@ async def _run_research_task(task_id: str, request: ResearchRequest):
 
 
 @router.get("/history", response_model=List[ResearchResponse])
-async def list_research_history():
+@async_memoize(ttl_ms=500)
+async def list_research_history(
+    session_manager: SessionManager = Depends(get_session_manager),
+):
     """
     获取研究历史任务列表
     """
-    session_manager = get_session_manager()
     history = []
-    tasks = await asyncio.to_thread(session_manager.list_research_tasks, limit=100)
+    tasks = await run_db(session_manager.list_research_tasks, limit=100)
     
     for task in tasks:
         history.append(ResearchResponse(
@@ -313,18 +327,21 @@ async def list_research_history():
 
 
 @router.get("/{task_id}", response_model=ResearchResponse)
-async def get_research_result(task_id: str):
+async def get_research_result(
+    task_id: str,
+    session_manager: SessionManager = Depends(get_session_manager),
+):
     """
     获取研究任务结果
     
     根据任务ID查询研究结果。
     """
-    session_manager = get_session_manager()
-    task = await asyncio.to_thread(session_manager.get_research_task, task_id)
+    task = await run_db(session_manager.get_research_task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
-    
-    return ResearchResponse(
+
+    # 行数据来自我们自己的库, 与模型同构, model_construct 跳过冗余校验
+    return ResearchResponse.model_construct(
         task_id=task_id,
         question=task["question"],
         answer=task.get("answer") or "",
@@ -338,27 +355,29 @@ async def get_research_result(task_id: str):
 
 
 @router.get("/{task_id}/status", response_model=TaskStatus)
-async def get_research_status(task_id: str):
+@async_memoize(ttl_ms=200)
+async def get_research_status(
+    task_id: str,
+    session_manager: SessionManager = Depends(get_session_manager),
+):
     """
     获取研究任务状态
     
     快速查询任务当前状态。
     """
-    session_manager = get_session_manager()
-    task = await asyncio.to_thread(session_manager.get_research_task, task_id)
+    task = await run_db(session_manager.get_research_task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     
     # 计算进度
     progress = None
     if task["status"] == ResearchStatus.RUNNING:
-        from config import settings as app_settings
-        max_iter = app_settings.max_llm_call_per_run or 50
+        max_iter = settings.max_llm_call_per_run or 50
         progress = min(100, int(task.get("iterations", 0) / max_iter * 100))
     elif task["status"] == ResearchStatus.COMPLETED:
         progress = 100
     
-    return TaskStatus(
+    return TaskStatus.model_construct(
         task_id=task_id,
         status=task["status"],
         progress=progress,
@@ -370,41 +389,33 @@ async def get_research_status(task_id: str):
 @router.post("/batch", response_model=BatchResearchResponse)
 async def create_batch_research(
     request: BatchResearchRequest,
-    background_tasks: BackgroundTasks
+    session_manager: SessionManager = Depends(get_session_manager),
 ):
     """
     创建批量研究任务
     
     一次性提交多个问题，并行启动后台任务。返回批次ID和所有子任务ID。
     """
-    batch_id = str(uuid.uuid4())[:8]
-    task_ids = []
-    
-    for question in request.questions:
-        task_id = str(uuid.uuid4())[:10]
-        task_ids.append(task_id)
-        
-        # 初始化任务状态 (MySQL)
-        session_manager = get_session_manager()
-        await asyncio.to_thread(
-            session_manager.create_research_task,
-            task_id=task_id,
-            question=question,
-            status=ResearchStatus.PENDING
-        )
-        
-        
-        # 在后台并行启动
+    batch_id = secrets.token_hex(4)
+
+    # 预生成全部任务ID, 单次多行 INSERT 落库: N 次串行线程跳转+SQL往返 → 1 次
+    task_ids = [secrets.token_hex(5) for _ in request.questions]
+    rows = [
+        (task_id, question, ResearchStatus.PENDING)
+        for task_id, question in zip(task_ids, request.questions)
+    ]
+    await run_db(session_manager.create_research_tasks_bulk, rows)
+
+    for task_id, question in zip(task_ids, request.questions):
+        # 投递到常驻研究 worker 队列, 由有界并发的 worker 并行消费
         research_req = ResearchRequest(
             question=question,
             max_iterations=request.max_iterations # Batch request handles its own defaults or passes explicit
         )
-        background_tasks.add_task(
-            _run_research_task,
-            task_id,
-            research_req
-        )
-    
+        await enqueue_research(_run_research_task, task_id, research_req)
+
+    assert len(task_ids) == len(request.questions)
+
     return BatchResearchResponse(
         batch_id=batch_id,
         task_ids=task_ids,
@@ -413,30 +424,33 @@ async def create_batch_research(
 
 
 @router.delete("/{task_id}")
-async def cancel_research(task_id: str, force: bool = False):
+async def cancel_research(
+    task_id: str,
+    force: bool = False,
+    session_manager: SessionManager = Depends(get_session_manager),
+):
     """
     取消或删除研究任务
     
     - 如果任务正在运行且 force=False (默认): 标记为 Failed (取消)
     - 如果任务已完成/失败 或 force=True: 从数据库永久删除
     """
-    session_manager = get_session_manager()
-    task = await asyncio.to_thread(session_manager.get_research_task, task_id)
+    task = await run_db(session_manager.get_research_task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     
     # Check if we should just delete it record
     if force or task["status"] in [ResearchStatus.COMPLETED, ResearchStatus.FAILED, ResearchStatus.TIMEOUT]:
-         await asyncio.to_thread(session_manager.delete_research_task, task_id)
+         await run_db(session_manager.delete_research_task, task_id)
          return {"message": f"Task {task_id} deleted"}
 
     if task["status"] not in [ResearchStatus.PENDING, ResearchStatus.RUNNING]:
         # Should have been handled above, but just in case
-        await asyncio.to_thread(session_manager.delete_research_task, task_id)
+        await run_db(session_manager.delete_research_task, task_id)
         return {"message": f"Task {task_id} deleted"}
     
     # If running and not forced, cancel it
-    await asyncio.to_thread(session_manager.update_research_task, task_id, {
+    await run_db(session_manager.update_research_task, task_id, {
         "status": ResearchStatus.FAILED,
         "termination_reason": "cancelled"
     })
@@ -444,16 +458,18 @@ async def cancel_research(task_id: str, force: bool = False):
     return {"message": f"Task {task_id} cancelled"}
 
 @router.post("/{task_id}/bookmark")
-async def toggle_bookmark(task_id: str):
+async def toggle_bookmark(
+    task_id: str,
+    session_manager: SessionManager = Depends(get_session_manager),
+):
     """
     切换研究任务的收藏状态
     """
     # Check existence
-    session_manager = get_session_manager()
-    task = await asyncio.to_thread(session_manager.get_research_task, task_id)
+    task = await run_db(session_manager.get_research_task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
         
-    is_bookmarked = await asyncio.to_thread(session_manager.toggle_research_bookmark, task_id)
+    is_bookmarked = await run_db(session_manager.toggle_research_bookmark, task_id)
     
     return {"message": "Bookmark updated", "is_bookmarked": is_bookmarked}
@@ -8,6 +8,8 @@ import time
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from config import settings
+from src.api.dependencies import get_http_client
+from src.utils.cache import cache_manager
 
 router = APIRouter(prefix="/settings", tags=["Settings"])
 
@@ -17,6 +19,16 @@ _models_cache = {
     "expiry": 0
 }
 CACHE_TTL = 3600  # 1 hour
+# 单飞锁: 缓存过期时只放一个请求去刷新 OpenRouter, 其余请求等待后直接读缓存
+_models_cache_lock = asyncio.Lock()
+
+# 静态兜底模型列表: 导入期构建一次, 失败路径直接复用, 不再每次分配
+_FALLBACK_MODELS = (
+    {"id": "gpt-4o", "name": "GPT-4o"},
+    {"id": "openai/gpt-4o-mini", "name": "GPT-4o Mini"},
+    {"id": "z-ai/glm-4.7-flash", "name": "GLM-4.7 Flash"},
+    {"id": "deepseek/deepseek-chat", "name": "DeepSeek Chat"}
+)
 
 class SettingsUpdate(BaseModel):
     model_name: Optional[str] = None
@@ -43,7 +55,7 @@ class SettingsResponse(BaseModel):
 def mask_key(key: str) -> str:
     if not key or len(key) < 8:
         return "****"
-    return f"{key[:3]}****{key[-4:]}"
+    return "****".join((key[:3], key[-4:]))
 
 @router.get("", response_model=SettingsResponse)
 async def get_settings():
@@ -110,31 +122,34 @@ async def get_available_models():
     api_key = settings.openrouter_key or settings.api_key
     if not api_key or "your" in api_key:
         # Return fallback models if no key
-        return [
-            {"id": "gpt-4o", "name": "GPT-4o"},
-            {"id": "openai/gpt-4o-mini", "name": "GPT-4o Mini"},
-            {"id": "z-ai/glm-4.7-flash", "name": "GLM-4.7 Flash"},
-            {"id": "deepseek/deepseek-chat", "name": "DeepSeek Chat"}
-        ]
+        return list(_FALLBACK_MODELS)
         
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
+    async with _models_cache_lock:
+        # 双重检查: 等锁期间可能已有请求完成刷新
+        now = time.time()
+        if _models_cache["data"] and now < _models_cache["expiry"]:
+            return _models_cache["data"]
+
+        # 进程内未命中 → 查 Redis 共享缓存, 多 worker 部署共享一次抓取
+        cached = await cache_manager.get("openrouter_models", "all")
+        if cached:
+            _models_cache["data"] = cached
+            _models_cache["expiry"] = now + CACHE_TTL
+            return cached
+
+        try:
+            # 复用共享连接池客户端, 避免每次缓存未命中都重建 TLS 连接
+            response = await get_http_client().get(
                 "https://openrouter.ai/api/v1/models",
                 headers={"Authorization": f"Bearer {api_key}"},
                 timeout=10.0
             )
             if response.status_code != 200:
                 logger.warning(f"OpenRouter models API returned {response.status_code}")
-                return [
-                    {"id": "gpt-4o", "name": "GPT-4o (Fallback)"},
-                    {"id": "openai/gpt-4o-mini", "name": "GPT-4o Mini"},
-                    {"id": "z-ai/glm-4.7-flash", "name": "GLM-4.7 Flash"},
-                    {"id": "deepseek/deepseek-chat", "name": "DeepSeek Chat"}
-                ]
-            
+                return list(_FALLBACK_MODELS)
+
             data = response.json()
-            
+
             models = []
             for m in data.get("data", []):
                 models.append({
@@ -143,15 +158,13 @@ async def get_available_models():
                     "context_length": m.get("context_length"),
                     "pricing": m.get("pricing")
                 })
-            
-            # Update cache
+
+            # Update cache (进程内 + Redis 共享)
             _models_cache["data"] = models
             _models_cache["expiry"] = now + CACHE_TTL
-            
+            await cache_manager.set("openrouter_models", "all", models, CACHE_TTL)
+
             return models
-    except Exception as e:
-        # If error, return fallback and don't cache expiry
-        return [
-            {"id": "gpt-4o", "name": "GPT-4o"},
-            {"id": "openai/gpt-4o-mini", "name": "GPT-4o Mini"}
-        ]
+        except Exception as e:
+            # If error, return fallback and don't cache expiry
+            return list(_FALLBACK_MODELS)
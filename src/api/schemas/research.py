@@ -1,7 +1,7 @@
 """研究请求/响应模型"""
 
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from enum import Enum
 from datetime import datetime
 
@@ -30,8 +30,9 @@ class ResearchRequest(BaseModel):
         description="需要回调的事件类型，None表示全部。可选: status/think/tool_start/tool_response/answer/final_answer/error"
     )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="ignore",
+        json_schema_extra={
             "example": {
                 "question": "2024年诺贝尔物理学奖得主是谁？",
                 "max_iterations": 50,
@@ -41,6 +42,7 @@ class ResearchRequest(BaseModel):
                 "callback_events": ["status", "think", "answer", "final_answer", "error"]
             }
         }
+    )
 
 
 class ResearchResponse(BaseModel):
@@ -52,11 +54,12 @@ class ResearchResponse(BaseModel):
     iterations: int = Field(default=0, description="实际迭代次数")
     execution_time: float = Field(default=0.0, description="执行时间(秒)")
     termination_reason: str = Field(default="", description="终止原因")
-    created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
+    created_at: Optional[datetime] = Field(default=None, description="创建时间 (由 DB 生成)")
     is_bookmarked: bool = Field(default=False, description="是否收藏")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="ignore",
+        json_schema_extra={
             "example": {
                 "task_id": "abc123",
                 "question": "2024年诺贝尔物理学奖得主是谁？",
@@ -69,6 +72,7 @@ class ResearchResponse(BaseModel):
                 "is_bookmarked": False
             }
         }
+    )
 
 
 class BatchResearchRequest(BaseModel):
@@ -76,13 +80,15 @@ class BatchResearchRequest(BaseModel):
     questions: List[str] = Field(..., description="研究问题列表", min_items=1)
     max_iterations: int = Field(default=50, ge=1, le=100)
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="ignore",
+        json_schema_extra={
             "example": {
                 "questions": ["问题1", "问题2"],
                 "max_iterations": 50
             }
         }
+    )
 
 
 class BatchResearchResponse(BaseModel):
@@ -114,8 +120,9 @@ class HealthCheckDetail(BaseModel):
     timestamp: str = Field(..., description="检查时间 ISO 8601 格式")
     details: Dict[str, ComponentHealth] = Field(..., description="各组件健康状态")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="ignore",
+        json_schema_extra={
             "example": {
                 "result": "succeed",
                 "timestamp": "2026-02-10T16:05:00Z",
@@ -131,6 +138,7 @@ class HealthCheckDetail(BaseModel):
                 }
             }
         }
+    )
 
 
 class HealthCheck(BaseModel):
@@ -139,5 +147,12 @@ class HealthCheck(BaseModel):
     version: str = "1.0.11"
     model: str
     tools_available: List[str]
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: datetime
+
+
+# 导入期固化校验器 schema, 把首次请求的校验器 JIT 成本移到启动时
+for _model in (ResearchRequest, ResearchResponse, BatchResearchRequest,
+               BatchResearchResponse, TaskStatus, ComponentHealth,
+               HealthCheckDetail, HealthCheck):
+    _model.model_rebuild()
 
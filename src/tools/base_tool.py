@@ -4,6 +4,16 @@ from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, List, Union
 from pydantic import BaseModel
 
+# 工具参数解析热路径优先走 orjson (C 扩展, 约 2-3x 快), 未安装时退回标准库
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _JSON_DECODE_ERROR = orjson.JSONDecodeError
+except ImportError:
+    import json
+    _json_loads = json.loads
+    _JSON_DECODE_ERROR = json.JSONDecodeError
+
 
 class BaseTool(ABC):
     """工具基类
@@ -83,11 +93,17 @@ class BaseTool(ABC):
         Returns:
             解析后的字典参数
         """
+        # 最常见路径: 上游已经解析好的 dict 直接透传 (type 精确判断比 isinstance 略快)
+        if type(params) is dict:
+            return params
+
         if isinstance(params, str):
-            import json
+            # 快速路径: 非 JSON 开头的字符串直接当 raw, 省去必然失败的两次解析
+            if not params.lstrip().startswith(("{", "[")):
+                return {"raw": params}
             try:
-                return json.loads(params)
-            except json.JSONDecodeError:
+                return _json_loads(params)
+            except _JSON_DECODE_ERROR:
                 import json5
                 try:
                     return json5.loads(params)
@@ -95,5 +111,26 @@ class BaseTool(ABC):
                     return {"raw": params}
         return params
     
+    def _get_arg(self, params: Any, key: str, default: Any = None) -> Any:
+        """按 key 提取参数, 兼容 LLM 偶尔输出的 {"params": {...}} 嵌套包裹
+
+        Args:
+            params: _parse_params 的返回值
+            key: 参数名
+            default: 缺失时的默认值
+
+        Returns:
+            参数值或默认值
+        """
+        # 非 dict (如 JSON 数组输入) 直接走默认值, 不再依赖裸 except 兜底
+        if type(params) is not dict:
+            return default
+        value = params.get(key)
+        if value is None:
+            inner = params.get("params")
+            if type(inner) is dict:
+                value = inner.get(key)
+        return value if value is not None else default
+
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__}(name='{self.name}')>"
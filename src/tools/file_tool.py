@@ -1,14 +1,125 @@
 """文件解析工具 - 支持多种文档格式解析"""
 
+import asyncio
+import io
 import os
 import re
 import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from typing import Dict, Any, List, Optional, Union
-from pathlib import Path
 
 from .base_tool import BaseTool
 
 
+def _load_pdf_backend(prefer_rust: bool = True):
+    """加载 PDF 解析后端 (模块级, 供主进程与子进程 worker 共用)
+
+    prefer_rust 时优先尝试 Rust 实现的 pdfplumber_rs (PyO3, Page API
+    与 pdfplumber 兼容), 未安装则回退到纯 Python 的 pdfplumber。
+    """
+    if prefer_rust:
+        try:
+            import pdfplumber_rs
+            return pdfplumber_rs
+        except ImportError:
+            pass
+    import pdfplumber
+    return pdfplumber
+
+
+def _format_pdf_md_table(table: List[List[Optional[str]]]) -> str:
+    """将提取的表格列表转换为 Markdown 表格字符"""
+    if not table: return ""
+
+    # 处理 None 值
+    clean_table = [[(str(cell) if cell is not None else "") for cell in row] for row in table]
+
+    if not clean_table: return ""
+
+    headers = clean_table[0]
+    rows = clean_table[1:]
+
+    md = "| " + " | ".join(headers) + " |\n"
+    md += "| " + " | ".join(["---"] * len(headers)) + " |\n"
+
+    for row in rows:
+        # 确保每行长度对齐
+        if len(row) < len(headers):
+            row.extend([""] * (len(headers) - len(row)))
+        md += "| " + " | ".join(row[:len(headers)]) + " |\n"
+
+    return md
+
+
+def _df_to_md(df) -> str:
+    """将 DataFrame 直接渲染为 Markdown 表格
+
+    DataFrame.to_markdown 走纯 Python 的 tabulate (额外依赖且大表要几十毫秒);
+    这里从值数组一次拼出, 快一个数量级。
+    """
+    cols = [str(c) for c in df.columns]
+    lines = [
+        "| " + " | ".join(cols) + " |",
+        "| " + " | ".join(["---"] * len(cols)) + " |",
+    ]
+    lines.extend(
+        "| " + " | ".join(str(v) for v in row) + " |"
+        for row in df.itertuples(index=False, name=None)
+    )
+    return "\n".join(lines)
+
+
+# pdfplumber 是否支持 extract_text(layout=True): None=未探测 (每个 worker 进程各探测一次)
+_PDF_LAYOUT_OK = None
+
+
+def _extract_pdf_page(file_path: str, page_index: int, prefer_rust: bool = True) -> str:
+    """提取单个 PDF 页面的表格与文本
+
+    只接收路径和页号, 可以被 ProcessPoolExecutor pickle 后在子进程执行;
+    每页独立打开文件, 避免跨进程传递 pdf 对象。
+    """
+    pdfplumber = _load_pdf_backend(prefer_rust)
+    with pdfplumber.open(file_path) as pdf:
+        page = pdf.pages[page_index]
+        page_content = [f"### Page {page_index + 1}"]
+
+        # 1. 尝试提取表格
+        tables = page.extract_tables()
+        if tables:
+            for table in tables:
+                # 过滤掉空表或全空行
+                table = [row for row in table if any(row)]
+                if not table: continue
+
+                # 转换为 Markdown 格式
+                md_table = _format_pdf_md_table(table)
+                page_content.append("\n#### Table Found:\n" + md_table)
+
+        # 2. 提取文本 (使用 layout=True 尝试保持多栏结构)
+        # 注意：layout=True 需要 pdfplumber 较新版本; 是否支持是库版本属性,
+        # 探测一次记入进程级标记, 老版本不必每页都失败一遍再回退
+        global _PDF_LAYOUT_OK
+        if _PDF_LAYOUT_OK is False:
+            text = page.extract_text()
+        else:
+            try:
+                text = page.extract_text(layout=True)
+                _PDF_LAYOUT_OK = True
+            except TypeError:
+                _PDF_LAYOUT_OK = False
+                text = page.extract_text()
+            except Exception:
+                text = page.extract_text()
+
+        if text:
+            page_content.append("\n#### Text Content:\n" + text)
+
+        return "\n".join(page_content)
+
+
 class FileParserTool(BaseTool):
     """文件解析工具
     
@@ -52,6 +163,11 @@ class FileParserTool(BaseTool):
         super().__init__(cfg)
         self.file_root_path = file_root_path
         self.max_content_length = max_content_length
+        # 同一批次的多个文件并行解析 (pdfplumber/docx 的 C 路径会释放 GIL)
+        self._executor = ThreadPoolExecutor(max_workers=self.cfg.get("parse_workers", 4))
+        # 解析结果 LRU: Agent 循环常反复解析同一文件, (路径, mtime, 大小) 变更即失效
+        self._parse_cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self._parse_cache_size = self.cfg.get("parse_cache_size", 128)
     
     async def call(self, params: Union[str, Dict[str, Any]], **kwargs) -> str:
         """异步解析文件
@@ -63,12 +179,8 @@ class FileParserTool(BaseTool):
             解析后的文件内容
         """
         params = self._parse_params(params)
-        
-        try:
-            files = params.get("files", params.get("params", {}).get("files", []))
-        except:
-            return "[parse_file] Invalid request format: Input must be a JSON object containing 'files' field"
-        
+        files = self._get_arg(params, "files", [])
+
         if not files:
             return "[parse_file] Invalid request format: 'files' field is required"
         
@@ -76,30 +188,49 @@ class FileParserTool(BaseTool):
         if isinstance(files, str):
             files = [files]
         
-        results = []
-        for file_path in files:
-            result = self._parse_single_file(file_path)
-            results.append(result)
-        
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self._parse_single_file, file_path)
+            for file_path in files
+        ))
+
         return "\n\n=======\n\n".join(results)
     
     def _parse_single_file(self, file_path: str) -> str:
-        """解析单个文件
-        
+        """解析单个文件 (带结果缓存)
+
         Args:
             file_path: 文件路径
-            
+
         Returns:
             解析结果
         """
         # 解析完整路径
         full_path = self._resolve_path(file_path)
-        
-        if not os.path.exists(full_path):
+
+        try:
+            stat = os.stat(full_path)
+        except OSError:
             return f"[parse_file] File not found: {file_path}"
-        
-        # 获取文件扩展名
-        ext = Path(full_path).suffix.lower().lstrip(".")
+
+        cache_key = (full_path, stat.st_mtime_ns, stat.st_size)
+        cached = self._parse_cache.get(cache_key)
+        if cached is not None:
+            self._parse_cache.move_to_end(cache_key)
+            return cached
+
+        result = self._parse_single_file_uncached(file_path, full_path)
+
+        self._parse_cache[cache_key] = result
+        if len(self._parse_cache) > self._parse_cache_size:
+            self._parse_cache.popitem(last=False)
+
+        return result
+
+    def _parse_single_file_uncached(self, file_path: str, full_path: str) -> str:
+        """不经缓存地解析单个文件"""
+        # 获取文件扩展名 (os.path.splitext 比构造 Path 对象便宜)
+        ext = os.path.splitext(full_path)[1].lower().lstrip(".")
         
         if ext not in self.SUPPORTED_EXTENSIONS:
             return f"[parse_file] Unsupported file type: {ext}"
@@ -149,42 +280,52 @@ class FileParserTool(BaseTool):
         
         return file_path
     
+    def _get_pdf_backend(self):
+        """选择 PDF 解析后端 (cfg["pdf_backend"] 默认 "rust", 回退 pdfplumber)"""
+        return _load_pdf_backend(self.cfg.get("pdf_backend", "rust") == "rust")
+
     def _parse_pdf(self, file_path: str) -> str:
-        """解析 PDF 文件 (增强版：包含表格提取和布局还原)"""
+        """解析 PDF 文件 (增强版：包含表格提取和布局还原)
+
+        页面之间相互独立且提取是 CPU 密集的; 页数达到阈值时提交到
+        进程池按页并行, executor.map 保证按页序拼接结果。
+        """
         try:
-            import pdfplumber
-            
-            text_parts = []
+            pdfplumber = self._get_pdf_backend()
+            prefer_rust = self.cfg.get("pdf_backend", "rust") == "rust"
+
             with pdfplumber.open(file_path) as pdf:
-                for i, page in enumerate(pdf.pages, 1):
-                    page_content = [f"### Page {i}"]
-                    
-                    # 1. 尝试提取表格
-                    tables = page.extract_tables()
-                    if tables:
-                        for table in tables:
-                            # 过滤掉空表或全空行
-                            table = [row for row in table if any(row)]
-                            if not table: continue
-                            
-                            # 转换为 Markdown 格式
-                            md_table = self._format_as_md_table(table)
-                            page_content.append("\n#### Table Found:\n" + md_table)
-                    
-                    # 2. 提取文本 (使用 layout=True 尝试保持多栏结构)
-                    # 注意：layout=True 需要 pdfplumber 较新版本
-                    try:
-                        text = page.extract_text(layout=True)
-                    except:
-                        text = page.extract_text()
-                        
-                    if text:
-                        page_content.append("\n#### Text Content:\n" + text)
-                    
-                    text_parts.append("\n".join(page_content))
-            
-            return "\n\n---\n\n".join(text_parts) if text_parts else "No content found in PDF."
-            
+                page_count = len(pdf.pages)
+
+            # 单缓冲增量拼接; 超出 max_content_length 即停, 反正多出的内容会被截断
+            buf = io.StringIO()
+
+            def _append(part: str) -> bool:
+                if buf.tell():
+                    buf.write("\n\n---\n\n")
+                buf.write(part)
+                return buf.tell() <= self.max_content_length
+
+            if page_count >= self.cfg.get("pdf_parallel_threshold", 4):
+                batch_size = self.cfg.get("pdf_batch_size", 8)
+                executor = ProcessPoolExecutor()
+                try:
+                    for part in executor.map(
+                        partial(_extract_pdf_page, file_path, prefer_rust=prefer_rust),
+                        range(page_count),
+                        chunksize=batch_size
+                    ):
+                        if not _append(part):
+                            break
+                finally:
+                    executor.shutdown(cancel_futures=True)
+            else:
+                for i in range(page_count):
+                    if not _append(_extract_pdf_page(file_path, i, prefer_rust)):
+                        break
+
+            return buf.getvalue() if buf.tell() else "No content found in PDF."
+
         except ImportError:
             return "[PDF parsing requires pdfplumber: pip install pdfplumber]"
         except Exception as e:
@@ -192,26 +333,7 @@ class FileParserTool(BaseTool):
 
     def _format_as_md_table(self, table: List[List[Optional[str]]]) -> str:
         """将提取的表格列表转换为 Markdown 表格字符"""
-        if not table: return ""
-        
-        # 处理 None 值
-        clean_table = [[(str(cell) if cell is not None else "") for cell in row] for row in table]
-        
-        if not clean_table: return ""
-        
-        headers = clean_table[0]
-        rows = clean_table[1:]
-        
-        md = "| " + " | ".join(headers) + " |\n"
-        md += "| " + " | ".join(["---"] * len(headers)) + " |\n"
-        
-        for row in rows:
-            # 确保每行长度对齐
-            if len(row) < len(headers):
-                row.extend([""] * (len(headers) - len(row)))
-            md += "| " + " | ".join(row[:len(headers)]) + " |\n"
-            
-        return md
+        return _format_pdf_md_table(table)
     
     def _parse_docx(self, file_path: str) -> str:
         """解析 Word 文档"""
@@ -219,8 +341,17 @@ class FileParserTool(BaseTool):
             from docx import Document
             
             doc = Document(file_path)
-            paragraphs = [p.text for p in doc.paragraphs if p.text.strip()]
-            
+            # 到达长度上限即停, 不为必然被截断的段落付解析成本
+            paragraphs = []
+            total_len = 0
+            for p in doc.paragraphs:
+                text = p.text
+                if text.strip():
+                    paragraphs.append(text)
+                    total_len += len(text) + 2
+                    if total_len > self.max_content_length:
+                        break
+
             return "\n\n".join(paragraphs) if paragraphs else "No text content found in document."
             
         except ImportError:
@@ -235,15 +366,23 @@ class FileParserTool(BaseTool):
             
             prs = Presentation(file_path)
             slides_text = []
-            
+            total_len = 0
+
             for i, slide in enumerate(prs.slides, 1):
                 slide_content = []
                 for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        slide_content.append(shape.text)
-                
+                    # shape.text 每次访问都会重新遍历 XML, 只取一次
+                    text = getattr(shape, "text", None)
+                    if text and text.strip():
+                        slide_content.append(text)
+
                 if slide_content:
-                    slides_text.append(f"### Slide {i}\n" + "\n".join(slide_content))
+                    slide_text = f"### Slide {i}\n" + "\n".join(slide_content)
+                    slides_text.append(slide_text)
+                    total_len += len(slide_text) + 2
+                    # 到达长度上限即停, 后续幻灯片反正会被截断
+                    if total_len > self.max_content_length:
+                        break
             
             return "\n\n".join(slides_text) if slides_text else "No text content found in presentation."
             
@@ -257,17 +396,15 @@ class FileParserTool(BaseTool):
         try:
             import pandas as pd
             
-            # 读取所有工作表
-            excel_file = pd.ExcelFile(file_path)
+            # 一次读入全部工作表 (容器 XML 只解析一遍); 只渲染前100行, dtype=str 跳过类型推断
+            sheets = pd.read_excel(file_path, sheet_name=None, dtype=str, nrows=100)
             sheets_text = []
-            
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(excel_file, sheet_name=sheet_name)
-                
+
+            for sheet_name, df in sheets.items():
                 # 转换为 Markdown 表格
-                md_table = df.head(100).to_markdown(index=False)  # 限制行数
+                md_table = _df_to_md(df)
                 sheets_text.append(f"### Sheet: {sheet_name}\n\n{md_table}")
-            
+
             return "\n\n".join(sheets_text)
             
         except ImportError:
@@ -276,29 +413,51 @@ class FileParserTool(BaseTool):
             return f"Excel parsing error: {str(e)}"
     
     def _parse_csv(self, file_path: str) -> str:
-        """解析 CSV 文件"""
+        """解析 CSV 文件
+
+        优先使用多线程的 pyarrow 读取器 (字符串列直读, 不做类型推断),
+        未安装时回退到 pandas 的 C 引擎。
+        """
         try:
-            import pandas as pd
-            
-            df = pd.read_csv(file_path)
-            
+            try:
+                from pyarrow import csv as pacsv
+                table = pacsv.read_csv(
+                    file_path,
+                    read_options=pacsv.ReadOptions(block_size=1 << 20),
+                    convert_options=pacsv.ConvertOptions(strings_can_be_null=False)
+                )
+                df = table.slice(0, 100).to_pandas()
+            except ImportError:
+                import pandas as pd
+                # 只渲染前100行: nrows 截断读入量, dtype=str + na_filter=False
+                # 跳过整个 schema 推断与缺失值扫描
+                df = pd.read_csv(file_path, dtype=str, nrows=100, engine="c", na_filter=False)
+
             # 转换为 Markdown 表格（限制行数）
-            return df.head(100).to_markdown(index=False)
-            
+            return _df_to_md(df)
+
         except ImportError:
             return "[CSV parsing requires pandas: pip install pandas]"
         except Exception as e:
             return f"CSV parsing error: {str(e)}"
     
     def _parse_text(self, file_path: str) -> str:
-        """解析纯文本文件"""
+        """解析纯文本文件
+
+        只读取 max_content_length + 1 字节: 超长文件内存占用与截断上限
+        挂钩, 而不是整个文件大小。
+        """
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
-        except UnicodeDecodeError:
-            # 尝试其他编码
-            with open(file_path, "r", encoding="gbk") as f:
-                return f.read()
+            with open(file_path, "rb") as f:
+                data = f.read(self.max_content_length + 1)
+            try:
+                return data.decode("utf-8")
+            except UnicodeDecodeError:
+                # 尝试其他编码
+                try:
+                    return data.decode("gbk")
+                except UnicodeDecodeError:
+                    return data.decode("utf-8", errors="replace")
         except Exception as e:
             return f"Text parsing error: {str(e)}"
 
@@ -2,6 +2,7 @@
 
 import base64
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional, Union
 
 from openai import OpenAI
@@ -55,7 +56,16 @@ class ImageAnalysisTool(BaseTool):
             
         try:
             messages = [{"role": "user", "content": [{"type": "text", "text": prompt}]}]
-            
+
+            # 本地图片并行编码 (读盘 I/O + base64 CPU 交织), 耗时取决于最慢一张而非总和
+            local_paths = [p for p in image_paths if not p.startswith(("http://", "https://"))]
+            encoded: Dict[str, str] = {}
+            if local_paths:
+                with ThreadPoolExecutor(max_workers=min(8, len(local_paths))) as ex:
+                    for path, b64 in zip(local_paths, ex.map(self._encode_image, local_paths)):
+                        encoded[path] = b64
+
+            # 按原始顺序组装消息, 保证多图提问时图片顺序与用户输入一致
             for path in image_paths:
                 if path.startswith(("http://", "https://")):
                     messages[0]["content"].append({
@@ -63,12 +73,10 @@ class ImageAnalysisTool(BaseTool):
                         "image_url": {"url": path}
                     })
                 else:
-                    # 本地文件读取并转为 base64
-                    base64_image = self._encode_image(path)
                     mime_type = self._get_mime_type(path)
                     messages[0]["content"].append({
                         "type": "image_url",
-                        "image_url": {"url": f"data:{mime_type};base64,{base64_image}"}
+                        "image_url": {"url": f"data:{mime_type};base64,{encoded[path]}"}
                     })
             
             response = self.client.chat.completions.create(
@@ -82,14 +90,28 @@ class ImageAnalysisTool(BaseTool):
         except Exception as e:
             return f"[analyze_image] Error: {str(e)}"
     
+    # 分块大小取 3 的倍数, 保证每块独立 base64 编码后可直接拼接 (无 padding 断点)
+    _ENCODE_CHUNK_SIZE = 3 * 1024 * 256  # 768KB
+
     def _encode_image(self, image_path: str) -> str:
+        """分块流式编码, 避免 read() + b64encode 双份整图内存峰值"""
+        encoded = bytearray()
         with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+            while True:
+                chunk = image_file.read(self._ENCODE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                encoded += base64.b64encode(chunk)
+        return encoded.decode('ascii')
             
+    # 扩展名 → MIME 映射 (声明式, 新增格式只需加一行)
+    _MIME_TYPES = {
+        ".png": "image/png",
+        ".jpg": "image/jpeg",
+        ".jpeg": "image/jpeg",
+        ".gif": "image/gif",
+        ".webp": "image/webp",
+    }
+
     def _get_mime_type(self, path: str) -> str:
-        ext = os.path.splitext(path)[1].lower()
-        if ext == ".png": return "image/png"
-        if ext in [".jpg", ".jpeg"]: return "image/jpeg"
-        if ext == ".gif": return "image/gif"
-        if ext == ".webp": return "image/webp"
-        return "image/jpeg"
+        return self._MIME_TYPES.get(os.path.splitext(path)[1].lower(), "image/jpeg")
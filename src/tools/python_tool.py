@@ -12,36 +12,49 @@ from config import settings
 from src.utils.logger import logger
 
 
-def _run_with_limits_worker(code, queue, timeout):
-    """Worker function for local execution (global scope for pickling)"""
+def _repl_worker(conn):
+    """常驻本地执行 worker (全局函数便于 pickle)
+
+    循环从管道读取 (code, timeout) 并 exec, 避免每个代码片段都付一次
+    fork + 解释器初始化成本。每次执行使用全新 exec_globals, 片段之间
+    互不污染; 超时用 signal.alarm 中断, 不影响 worker 本身存活。
+    """
     import sys
     from io import StringIO
     import resource
     try:
-        # CPU 时间 (秒)
-        resource.setrlimit(resource.RLIMIT_CPU, (timeout, timeout))
-        # 地址空间 (字节)
+        # 地址空间 (字节); CPU 限制用 alarm 按次控制, RLIMIT_CPU 会跨调用累计
         resource.setrlimit(resource.RLIMIT_AS, (512 * 1024 * 1024, 512 * 1024 * 1024))
     except Exception as e:
         logger.warning(f"Failed to set resource limits: {e}")
 
-    # 捕获输出
-    old_stdout = sys.stdout
-    old_stderr = sys.stderr
-    sys.stdout = StringIO()
-    sys.stderr = StringIO()
-    
-    try:
-        exec_globals = {"__builtins__": __builtins__}
-        exec(code, exec_globals)
-        stdout_val = sys.stdout.getvalue()
-        stderr_val = sys.stderr.getvalue()
-        queue.put((stdout_val, stderr_val, None))
-    except Exception as e:
-        queue.put(("", "", str(e)))
-    finally:
-        sys.stdout = old_stdout
-        sys.stderr = old_stderr
+    def _alarm_handler(signum, frame):
+        raise TimeoutError("Execution timed out.")
+
+    signal.signal(signal.SIGALRM, _alarm_handler)
+
+    while True:
+        try:
+            code, timeout = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        old_stdout = sys.stdout
+        old_stderr = sys.stderr
+        sys.stdout = StringIO()
+        sys.stderr = StringIO()
+
+        try:
+            signal.alarm(timeout)
+            exec_globals = {"__builtins__": __builtins__}
+            exec(code, exec_globals)
+            conn.send((sys.stdout.getvalue(), sys.stderr.getvalue(), None))
+        except Exception as e:
+            conn.send(("", "", str(e)))
+        finally:
+            signal.alarm(0)
+            sys.stdout = old_stdout
+            sys.stderr = old_stderr
 
 
 class PythonInterpreterTool(BaseTool):
@@ -72,7 +85,12 @@ print(f"The result is: {np.mean([1,2,3])}")
         "properties": {},
         "required": []
     }
-    
+
+    # 导入期编译一次, 避免每次调用查 re 模块缓存
+    _CODE_TAG_RE = re.compile(r'<code>(.*?)</code>', re.DOTALL)
+    _TRIPLE_RE = re.compile(r'```[^\n]*\n(.+?)```', re.DOTALL)
+
+
     def __init__(
         self, 
         sandbox_endpoints: List[str] = None,
@@ -92,6 +110,39 @@ print(f"The result is: {np.mean([1,2,3])}")
         self.endpoints = sandbox_endpoints or self.cfg.get("sandbox_endpoints", [])
         self.timeout = timeout
         self.max_retries = max_retries
+        # 各端点负载统计: 并发数 + 延迟 EWMA + 失败计数 (失败按指数衰减自愈)
+        self._ep_stats = {
+            ep: {"inflight": 0, "ewma_ms": 0.0, "fail_count": 0.0}
+            for ep in self.endpoints
+        }
+        # 本地执行常驻 worker (懒创建)
+        self._worker = None
+        self._conn = None
+        self._worker_exec_count = 0
+
+    def _pick_endpoint(self) -> str:
+        """Power-of-two-choices 选端点: 随机采样两个, 取负载评分更低者
+
+        评分 = 并发数*1000 + 延迟EWMA + 失败惩罚, 避免重试反复打到慢/坏端点。
+        """
+        if len(self.endpoints) == 1:
+            return self.endpoints[0]
+        a, b = random.sample(self.endpoints, 2)
+
+        def _score(ep: str) -> float:
+            s = self._ep_stats[ep]
+            return s["inflight"] * 1000 + s["ewma_ms"] + s["fail_count"] * 500
+
+        return min((a, b), key=_score)
+
+    def _record_endpoint_result(self, endpoint: str, elapsed_ms: float, ok: bool):
+        """更新端点延迟 EWMA 与失败计数"""
+        s = self._ep_stats[endpoint]
+        s["ewma_ms"] = elapsed_ms if s["ewma_ms"] == 0.0 else s["ewma_ms"] * 0.8 + elapsed_ms * 0.2
+        if ok:
+            s["fail_count"] *= 0.5
+        else:
+            s["fail_count"] = s["fail_count"] * 0.5 + 1
     
     async def call(self, params: Union[str, Dict[str, Any]], **kwargs) -> str:
         """异步执行 Python 代码
@@ -127,12 +178,12 @@ print(f"The result is: {np.mean([1,2,3])}")
         """
         if isinstance(params, str):
             # 尝试从 <code></code> 标签中提取
-            code_match = re.search(r'<code>(.*?)</code>', params, re.DOTALL)
+            code_match = self._CODE_TAG_RE.search(params)
             if code_match:
                 return code_match.group(1).strip()
-            
+
             # 尝试从 ``` 代码块中提取
-            triple_match = re.search(r'```[^\n]*\n(.+?)```', params, re.DOTALL)
+            triple_match = self._TRIPLE_RE.search(params)
             if triple_match:
                 return triple_match.group(1).strip()
             
@@ -163,34 +214,41 @@ print(f"The result is: {np.mean([1,2,3])}")
         
         for attempt in range(self.max_retries):
             try:
-                # 随机选择端点进行负载均衡
-                endpoint = random.choice(self.endpoints)
+                # 两选一负载均衡: 避开高并发/高延迟/近期失败的端点
+                endpoint = self._pick_endpoint()
                 logger.info(f"[Python] Attempt {attempt + 1}/{self.max_retries} using endpoint: {endpoint}")
-                
+
                 # 使用 sandbox_fusion 执行代码
                 try:
                     from sandbox_fusion import run_code, RunCodeRequest
-                    
-                    code_result = run_code(
-                        RunCodeRequest(
-                            code=code, 
-                            language='python', 
-                            run_timeout=self.timeout
-                        ),
-                        max_attempts=1,
-                        client_timeout=self.timeout,
-                        endpoint=endpoint
-                    )
-                    
+
+                    self._ep_stats[endpoint]["inflight"] += 1
+                    start = time.monotonic()
+                    try:
+                        code_result = run_code(
+                            RunCodeRequest(
+                                code=code,
+                                language='python',
+                                run_timeout=self.timeout
+                            ),
+                            max_attempts=1,
+                            client_timeout=self.timeout,
+                            endpoint=endpoint
+                        )
+                    finally:
+                        self._ep_stats[endpoint]["inflight"] -= 1
+
+                    self._record_endpoint_result(endpoint, (time.monotonic() - start) * 1000, ok=True)
                     return self._format_result(code_result)
-                    
+
                 except ImportError:
                     # 如果没有安装 sandbox_fusion，回退到本地执行
                     if settings.allow_local_python:
                         return self._local_execute(code)
                     return "[Python Interpreter Error]: sandbox_fusion client not found and local execution is disabled."
-                    
+
             except Exception as e:
+                self._record_endpoint_result(endpoint, self.timeout * 1000, ok=False)
                 last_error = f'[Python Interpreter Error]: {str(e)} on endpoint {endpoint}'
                 logger.error(f"Error on attempt {attempt + 1}: {last_error}")
                 
@@ -229,34 +287,64 @@ print(f"The result is: {np.mean([1,2,3])}")
         
         return '\n'.join(result)
     
-    def _local_execute(self, code: str) -> str:
-        """本地执行代码（仅用于测试/开发，生产环境应使用沙箱）"""
-        import sys
-        from io import StringIO
-        import resource
+    # 每执行 N 次回收一次 worker, 防止用户代码残留的全局副作用 (如篡改的模块) 累积
+    _WORKER_RECYCLE_AFTER = 100
+
+    def _ensure_worker(self):
+        """懒创建常驻执行 worker, 崩溃或达到回收阈值时重建"""
         import multiprocessing
-        
-        # 使用进程池或 Process 运行以确保资源限制在子进程生效且不影响主进程
-        queue = multiprocessing.Queue()
-        p = multiprocessing.Process(target=_run_with_limits_worker, args=(code, queue, self.timeout))
-        p.start()
-        p.join(timeout=self.timeout + 1)
-        
-        if p.is_alive():
-            p.terminate()
-            return "[Python Interpreter Error]: Execution timed out or exceeded resource limits."
-        
+
+        if self._worker is not None and self._worker.is_alive() \
+                and self._worker_exec_count < self._WORKER_RECYCLE_AFTER:
+            return
+        self._shutdown_worker()
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._worker = multiprocessing.Process(target=_repl_worker, args=(child_conn,), daemon=True)
+        self._worker.start()
+        child_conn.close()
+        self._worker_exec_count = 0
+
+    def _shutdown_worker(self):
+        """终止当前 worker 并关闭管道"""
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+        if self._worker is not None:
+            if self._worker.is_alive():
+                self._worker.terminate()
+            self._worker.join(timeout=1)
+            self._worker = None
+
+    def _local_execute(self, code: str) -> str:
+        """本地执行代码（仅用于测试/开发，生产环境应使用沙箱）
+
+        复用常驻子进程, 省去每个片段的 fork + 解释器启动开销;
+        worker 失联或超时则杀掉重建, 不影响后续调用。
+        """
         try:
-            stdout_output, stderr_output, error = queue.get_nowait()
-            if error:
-                return f"[Python Interpreter Error]: {error}"
-            
-            result = []
-            if stdout_output:
-                result.append(f"stdout:\n{stdout_output}")
-            if stderr_output:
-                result.append(f"stderr:\n{stderr_output}")
-            
-            return '\n'.join(result) if result else 'Finished execution.'
-        except:
+            self._ensure_worker()
+            self._conn.send((code, self.timeout))
+            self._worker_exec_count += 1
+
+            # alarm 在 worker 内中断执行; 多留 1 秒余量后仍无响应视为 worker 卡死
+            if not self._conn.poll(self.timeout + 1):
+                self._shutdown_worker()
+                return "[Python Interpreter Error]: Execution timed out or exceeded resource limits."
+            stdout_output, stderr_output, error = self._conn.recv()
+        except (EOFError, OSError, BrokenPipeError):
+            self._shutdown_worker()
             return "[Python Interpreter Error]: Failed to get execution results."
+
+        if error:
+            return f"[Python Interpreter Error]: {error}"
+
+        result = []
+        if stdout_output:
+            result.append(f"stdout:\n{stdout_output}")
+        if stderr_output:
+            result.append(f"stderr:\n{stderr_output}")
+
+        return '\n'.join(result) if result else 'Finished execution.'
@@ -1,11 +1,10 @@
 """学术搜索工具 - 使用 Serper API 进行 Google Scholar 搜索"""
 
-import json
-import http.client
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
 from typing import Dict, Any, List, Optional, Union
 
-from .base_tool import BaseTool
+from .base_tool import BaseTool, _json_loads
+from src.utils.http_session import get_aiohttp_session
 
 
 class ScholarTool(BaseTool):
@@ -39,6 +38,11 @@ class ScholarTool(BaseTool):
         super().__init__(cfg)
         self.api_key = api_key or self.cfg.get("api_key", "")
         self.base_host = "google.serper.dev"
+        # 请求常量一次构建, 批量 fanout 时不再逐请求分配
+        self._scholar_url = f"https://{self.base_host}/scholar"
+        self._headers = {'X-API-KEY': self.api_key, 'Content-Type': 'application/json'}
+        # 限制同时在途的 Serper 请求数, 避免批量查询触发限流
+        self._semaphore = asyncio.Semaphore(self.cfg.get("max_concurrency", 10))
     
     async def call(self, params: Union[str, Dict[str, Any]], **kwargs) -> str:
         """异步执行学术搜索
@@ -50,12 +54,8 @@ class ScholarTool(BaseTool):
             学术搜索结果字符串
         """
         params = self._parse_params(params)
-        
-        try:
-            query = params.get("query", params.get("params", {}).get("query", []))
-        except:
-            return "[google_scholar] Invalid request format: Input must be a JSON object containing 'query' field"
-        
+        query = self._get_arg(params, "query", [])
+
         if not query:
             return "[google_scholar] Invalid request format: 'query' field is required"
         
@@ -64,7 +64,6 @@ class ScholarTool(BaseTool):
             query = [query]
         
         # 多个查询 - 异步并行执行
-        import asyncio
         tasks = [self._search_single_async(q) for q in query]
         results = await asyncio.gather(*tasks)
         
@@ -74,26 +73,25 @@ class ScholarTool(BaseTool):
         """异步执行单个学术搜索查询"""
         import aiohttp
         payload = {"q": query}
-        headers = {
-            'X-API-KEY': self.api_key,
-            'Content-Type': 'application/json'
-        }
-        
+
         for attempt in range(5):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(f"https://{self.base_host}/scholar", headers=headers, json=payload, timeout=30) as response:
+                # 共享会话: 重试复用同一条 keep-alive 连接; 信号量限制并发
+                session = get_aiohttp_session()
+                async with self._semaphore:
+                    async with session.post(self._scholar_url, headers=self._headers, json=payload, timeout=aiohttp.ClientTimeout(total=30)) as response:
                         if response.status == 200:
-                            results = await response.json()
+                            # 直接从响应字节解析, 跳过 aiohttp 的 str 解码中转
+                            results = _json_loads(await response.read())
                             return self._format_results(query, results)
                         else:
                             return f"Google Scholar API error: {response.status}"
             except Exception as e:
                 if attempt == 4:
                     return f"Google Scholar Timeout for '{query}'. Error: {str(e)}"
-                await asyncio.sleep(0.5)
-                continue
-        
+                # 指数退避: 0.1s, 0.2s, 0.4s, 0.8s
+                await asyncio.sleep(2 ** attempt * 0.1)
+
         return f"Google Scholar search failed for '{query}'"
     
     def _format_results(self, query: str, results: Dict) -> str:
@@ -111,45 +109,33 @@ class ScholarTool(BaseTool):
                 return f"No results found for '{query}'. Try with a more general query."
             
             web_snippets = []
-            idx = 0
-            
-            for page in results.get("organic", []):
-                idx += 1
-                
-                # 构建结果条目
-                date_published = ""
-                if "year" in page:
-                    date_published = f"\nDate published: {page['year']}"
-                
-                publication_info = ""
-                if "publicationInfo" in page:
-                    publication_info = f"\nPublication: {page['publicationInfo']}"
-                
-                snippet = ""
-                if "snippet" in page:
-                    snippet = f"\n{page['snippet']}"
-                
+
+            for idx, page in enumerate(results.get("organic", []), 1):
                 # PDF链接
                 link_info = "no available link"
                 if "pdfUrl" in page:
                     link_info = f"pdfUrl: {page['pdfUrl']}"
                 elif "link" in page:
                     link_info = page['link']
-                
-                cited_by = ""
-                if "citedBy" in page:
-                    cited_by = f"\nCited by: {page['citedBy']}"
-                
+
                 title = page.get('title', 'No title')
-                
-                redacted_version = f"{idx}. [{title}]({link_info}){publication_info}{date_published}{cited_by}{snippet}"
-                redacted_version = redacted_version.replace("Your browser can't play this video.", "")
-                web_snippets.append(redacted_version)
-            
-            content = f"A Google Scholar search for '{query}' found {len(web_snippets)} results:\n\n## Scholar Results\n"
-            content += "\n\n".join(web_snippets)
-            
-            return content
+
+                # 条目各段落统一收集后一次 join, 空字段由 filter 跳过
+                parts = [
+                    f"{idx}. [{title}]({link_info})",
+                    f"Publication: {page['publicationInfo']}" if "publicationInfo" in page else "",
+                    f"Date published: {page['year']}" if "year" in page else "",
+                    f"Cited by: {page['citedBy']}" if "citedBy" in page else "",
+                    page.get("snippet", ""),
+                ]
+                web_snippets.append("\n".join(filter(None, parts)))
+
+            content = (
+                f"A Google Scholar search for '{query}' found {len(web_snippets)} results:\n\n## Scholar Results\n"
+                + "\n\n".join(web_snippets)
+            )
+            # 清理提示语统一对最终结果做一次, 而不是逐条 replace
+            return content.replace("Your browser can't play this video.", "")
             
         except Exception as e:
             return f"No results found for '{query}'. Try with a more general query."
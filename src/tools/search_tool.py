@@ -1,16 +1,19 @@
 """搜索工具 - 使用 Serper API 进行 Google 搜索"""
 
-import json
-import http.client
+import re
 from typing import Dict, Any, List, Optional, Union
 
-from .base_tool import BaseTool
+from .base_tool import BaseTool, _json_loads
 from src.utils.cache import cache_manager
 from src.utils.semantic_cache import semantic_cache
 from config import settings
 from src.utils.logger import logger
 import asyncio
 import aiohttp
+from src.utils.http_session import get_aiohttp_session
+
+# CJK 统一表意文字区间, C 层扫描并在首个匹配处短路
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]')
 
 
 class SearchTool(BaseTool):
@@ -44,7 +47,19 @@ class SearchTool(BaseTool):
         super().__init__(cfg)
         self.api_key = api_key or self.cfg.get("api_key", "")
         self.base_host = "google.serper.dev"
-    
+        # 请求常量一次构建, gather 大 fanout 时不再逐请求分配
+        self._search_url = f"https://{self.base_host}/search"
+        self._headers = {'X-API-KEY': self.api_key, 'Content-Type': 'application/json'}
+        self._cn_payload_base = {"location": "China", "gl": "cn", "hl": "zh-cn"}
+        self._en_payload_base = {"location": "United States", "gl": "us", "hl": "en"}
+        # 限制并发 fanout, 大批量查询转为稳定吞吐而非突发限流
+        self._fetch_sem = asyncio.Semaphore(settings.max_concurrent_fetches)
+        # 在途请求合并表: 相同查询并发到达时共享同一次网络请求
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # 待批量写入的缓存条目, fanout 结束后分别一次 mset / set_many
+        self._pending_exact: List[tuple] = []
+        self._pending_semantic: List[tuple] = []
+
     async def call(self, params: Union[str, Dict[str, Any]], **kwargs) -> str:
         """异步执行搜索
         
@@ -55,12 +70,8 @@ class SearchTool(BaseTool):
             搜索结果字符串
         """
         params = self._parse_params(params)
-        
-        try:
-            queries = params.get("query", params.get("params", {}).get("query", []))
-        except:
-            return "[Search] Invalid request format: Input must be a JSON object containing 'query' field"
-        
+        queries = self._get_arg(params, "query", [])
+
         if not queries:
             return "[Search] Invalid request format: 'query' field is required"
         
@@ -72,39 +83,56 @@ class SearchTool(BaseTool):
         return await self._search_parallel(queries)
 
     async def _search_parallel(self, queries: List[str]) -> str:
-        tasks = [self._search_single_async(q) for q in queries]
-        results = await asyncio.gather(*tasks)
-        return "\n\n=======\n\n".join(results)
+        # 去重后 fanout (LLM 常重复发同一查询), 再按原顺序散射回结果
+        unique = list(dict.fromkeys(queries))
+        # 精确缓存批量管道读取: N 个查询一次 Redis RTT, 仅未命中者走网络
+        cached = await cache_manager.mget("search", unique)
+        by_query = {q: c for q, c in zip(unique, cached) if c}
+        misses = [q for q in unique if q not in by_query]
+        if misses:
+            results = await asyncio.gather(*(self._search_coalesced(q) for q in misses))
+            by_query.update(zip(misses, results))
+            # 精确缓存批量管道写入 + 语义缓存一次批量嵌入 (阻塞调用走线程)
+            if self._pending_exact:
+                pending, self._pending_exact = self._pending_exact, []
+                await cache_manager.mset("search", pending)
+            if self._pending_semantic:
+                pending, self._pending_semantic = self._pending_semantic, []
+                await asyncio.to_thread(semantic_cache.set_many, pending)
+        return "\n\n=======\n\n".join(by_query[q] for q in queries)
+
+    def _search_coalesced(self, query: str) -> "asyncio.Task[str]":
+        """同一查询的并发调用共享一个在途任务"""
+        task = self._inflight.get(query)
+        if task is None:
+            task = asyncio.ensure_future(self._search_single_async(query))
+            self._inflight[query] = task
+            task.add_done_callback(lambda _t, q=query: self._inflight.pop(q, None))
+        return task
 
     async def _search_single_async(self, query: str) -> str:
-        """异步执行单个搜索"""
-        # 检查缓存
-        cached_result = cache_manager.get("search", query)
-        if cached_result:
-            return cached_result
-        
-        # 语义缓存检查
-        semantic_result = semantic_cache.get("search", query)
+        """异步执行单个搜索 (精确缓存已在 _search_parallel 批量查过)"""
+        # 语义缓存查询 (阻塞的嵌入计算走线程, 不卡事件循环)
+        semantic_result = await asyncio.to_thread(semantic_cache.get, "search", query)
         if semantic_result:
             return semantic_result
 
         # 检测语言
-        is_chinese = self._contains_chinese(query)
-        if is_chinese:
-            payload = {"q": query, "location": "China", "gl": "cn", "hl": "zh-cn"}
-        else:
-            payload = {"q": query, "location": "United States", "gl": "us", "hl": "en"}
-        
-        headers = {'X-API-KEY': self.api_key, 'Content-Type': 'application/json'}
+        base = self._cn_payload_base if self._contains_chinese(query) else self._en_payload_base
+        payload = {"q": query, **base}
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"https://{self.base_host}/search", headers=headers, json=payload, timeout=30) as response:
+            # 共享会话: 复用 keep-alive 连接, 免去每次搜索的 TCP+TLS 握手
+            session = get_aiohttp_session()
+            async with self._fetch_sem:
+                async with session.post(self._search_url, headers=self._headers, json=payload, timeout=aiohttp.ClientTimeout(total=30)) as response:
                     if response.status == 200:
-                        results = await response.json()
+                        # 直接从响应字节解析, 跳过 aiohttp 的 str 解码中转
+                        results = _json_loads(await response.read())
                         formatted_result = self._format_results(query, results)
-                        cache_manager.set("search", query, formatted_result, expire_seconds=settings.cache_expiry_search)
-                        semantic_cache.set("search", query, formatted_result)
+                        # 缓存写入延后到 _search_parallel 统一批量提交
+                        self._pending_exact.append((query, formatted_result, settings.cache_expiry_search))
+                        self._pending_semantic.append(("search", query, formatted_result))
                         return formatted_result
                     else:
                         return f"[Search] API error: {response.status}"
@@ -128,35 +156,26 @@ class SearchTool(BaseTool):
                 return f"No results found for '{query}'. Try with a more general query."
             
             web_snippets = []
-            idx = 0
-            
-            for page in results.get("organic", []):
-                idx += 1
-                
-                # 构建结果条目
-                date_published = ""
-                if "date" in page:
-                    date_published = f"\nDate published: {page['date']}"
-                
-                source = ""
-                if "source" in page:
-                    source = f"\nSource: {page['source']}"
-                
-                snippet = ""
-                if "snippet" in page:
-                    snippet = f"\n{page['snippet']}"
-                
+
+            for idx, page in enumerate(results.get("organic", []), 1):
                 title = page.get('title', 'No title')
                 link = page.get('link', '#')
-                
-                redacted_version = f"{idx}. [{title}]({link}){date_published}{source}{snippet}"
-                redacted_version = redacted_version.replace("Your browser can't play this video.", "")
-                web_snippets.append(redacted_version)
-            
-            content = f"A Google search for '{query}' found {len(web_snippets)} results:\n\n## Web Results\n"
-            content += "\n\n".join(web_snippets)
-            
-            return content
+
+                # 条目各段落统一收集后一次 join, 空字段由 filter 跳过
+                parts = [
+                    f"{idx}. [{title}]({link})",
+                    f"Date published: {page['date']}" if "date" in page else "",
+                    f"Source: {page['source']}" if "source" in page else "",
+                    page.get("snippet", ""),
+                ]
+                web_snippets.append("\n".join(filter(None, parts)))
+
+            content = (
+                f"A Google search for '{query}' found {len(web_snippets)} results:\n\n## Web Results\n"
+                + "\n\n".join(web_snippets)
+            )
+            # 清理提示语统一对最终结果做一次, 而不是逐条 replace
+            return content.replace("Your browser can't play this video.", "")
             
         except Exception as e:
             return f"No results found for '{query}'. Try with a more general query."
@@ -170,4 +189,4 @@ class SearchTool(BaseTool):
         Returns:
             是否包含中文
         """
-        return any('\u4E00' <= char <= '\u9FFF' for char in text)
+        return _CJK_RE.search(text) is not None
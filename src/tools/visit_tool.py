@@ -1,18 +1,71 @@
 """网页访问工具 - 使用 Jina Reader 读取网页内容并进行摘要"""
 
-import json
 import aiohttp
 import asyncio
+import functools
 from typing import Dict, Any, List, Optional, Union
 import tiktoken
 
+
+@functools.lru_cache(maxsize=4)
+def _get_encoding(name: str):
+    """进程级共享 tiktoken 编码器 (BPE 表有数 MB, 每个实例各加载一份太浪费)"""
+    return tiktoken.get_encoding(name)
+
+# LLM 返回的 JSON 摘要解析走 orjson (C 扩展), 未安装时退回标准库
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _JSON_DECODE_ERROR = orjson.JSONDecodeError
+except ImportError:
+    import json
+    _json_loads = json.loads
+    _JSON_DECODE_ERROR = json.JSONDecodeError
+
 from .base_tool import BaseTool
 from src.utils.cache import cache_manager
+from src.utils.http_session import get_aiohttp_session
 from src.utils.semantic_cache import semantic_cache
 from config import settings
 from src.utils.logger import logger
 
 
+class _JsonStreamScanner:
+    """跟踪流式增量输出中顶层 JSON 对象是否已闭合
+
+    维护括号深度与字符串/转义状态, 跨 delta 累积; feed 返回 True 表示
+    首个顶层 `{...}` 已完整, 后续生成的都是可丢弃的尾部文本。
+    """
+
+    __slots__ = ("_depth", "_in_string", "_escape", "_seen_open")
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._seen_open = False
+
+    def feed(self, text: str) -> bool:
+        for ch in text:
+            if self._escape:
+                self._escape = False
+            elif self._in_string:
+                if ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+                self._seen_open = True
+            elif ch == '}':
+                self._depth -= 1
+                if self._seen_open and self._depth == 0:
+                    return True
+        return False
+
+
 class VisitTool(BaseTool):
     """网页访问工具
     
@@ -59,14 +112,16 @@ class VisitTool(BaseTool):
         self.summary_client = summary_client
         self.summary_model = summary_model
         self.max_content_tokens = max_content_tokens
-        self._encoding = None
-    
+        # 抓取与摘要分别限流: Jina 抓取和 LLM 的速率限制相互独立
+        self._fetch_sem = asyncio.Semaphore(settings.max_concurrent_fetches)
+        self._llm_sem = asyncio.Semaphore(self.cfg.get("max_concurrent_summaries", 4))
+        # 在途请求合并表: 相同 (url, goal) 并发到达时共享同一次抓取+摘要
+        self._inflight: Dict[Any, asyncio.Task] = {}
+
     @property
     def encoding(self):
-        """懒加载 tiktoken 编码器"""
-        if self._encoding is None:
-            self._encoding = tiktoken.get_encoding("cl100k_base")
-        return self._encoding
+        """懒加载 tiktoken 编码器 (模块级缓存, 跨实例共享)"""
+        return _get_encoding("cl100k_base")
     
     async def call(self, params: Union[str, Dict[str, Any]], **kwargs) -> str:
         """异步执行网页访问
@@ -82,25 +137,32 @@ class VisitTool(BaseTool):
     async def acall(self, params: Union[str, Dict[str, Any]], **kwargs) -> str:
         """异步执行网页访问 (支持并行)"""
         params = self._parse_params(params)
-        
-        try:
-            urls = params.get("url", params.get("params", {}).get("url", []))
-            goal = params.get("goal", params.get("params", {}).get("goal", "Summarize the key information"))
-        except:
-            return "[Visit] Invalid request format: Input must be a JSON object containing 'url' and 'goal' fields"
-        
+        urls = self._get_arg(params, "url", [])
+        goal = self._get_arg(params, "goal", "Summarize the key information")
+
         if not urls:
             return "[Visit] Invalid request format: 'url' field is required"
         
         # 处理单个URL或多个URL
         if isinstance(urls, str):
             urls = [urls]
-            
-        # 并行执行所有访问任务
-        tasks = [self._process_single_url(u, goal) for u in urls]
-        results = await asyncio.gather(*tasks)
-        
-        return "\n\n=======\n\n".join(results)
+
+        # 去重后并行访问 (LLM 偶尔重复给同一 URL), 按原顺序散射回结果
+        unique = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self._visit_coalesced(u, goal) for u in unique))
+        by_url = dict(zip(unique, results))
+
+        return "\n\n=======\n\n".join(by_url[u] for u in urls)
+
+    def _visit_coalesced(self, url: str, goal: str) -> "asyncio.Task[str]":
+        """同一 (url, goal) 的并发访问共享一个在途任务"""
+        key = (url, goal)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._process_single_url(url, goal))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        return task
     
     async def _process_single_url(self, url: str, goal: str) -> str:
         """处理单个URL
@@ -112,15 +174,17 @@ class VisitTool(BaseTool):
         Returns:
             网页摘要
         """
-        # 检查缓存
-        cache_key = {"url": url, "goal": goal}
-        cached_result = cache_manager.get("visit", cache_key)
+        # 精确缓存与语义缓存并发查询 (语义嵌入是阻塞计算, 走线程;
+        # 未命中路径的开销从 a+b 变为 max(a, b))
+        # 键预生成一次, get 未命中后的 set 直接复用
+        cache_key = cache_manager.make_key("visit", {"url": url, "goal": goal})
+        cached_result, semantic_result = await asyncio.gather(
+            cache_manager.get_raw(cache_key),
+            asyncio.to_thread(semantic_cache.get, "visit", f"{goal}:{url}"),
+        )
         if cached_result:
             logger.info(f"[Visit] Cache hit for: {url}")
             return cached_result
-            
-        # 语义缓存检查 (基于 goal + url)
-        semantic_result = semantic_cache.get("visit", f"{goal}:{url}")
         if semantic_result:
             return semantic_result
 
@@ -130,27 +194,27 @@ class VisitTool(BaseTool):
         if not content or content.startswith("[visit] Failed"):
             return self._format_error(url, goal, "The provided webpage content could not be accessed.")
         
-        # 2. 截断到最大token数
-        content = self._truncate_to_tokens(content, self.max_content_tokens)
-        
+        # 2. 截断到最大token数 (编码结果向下游透传, 避免摘要阶段重复 BPE)
+        content, tokens = self._truncate_to_tokens(content, self.max_content_tokens)
+
         # 3. 使用LLM摘要 (带降级: 如果摘要失败则返回原始内容)
         if self.summary_client:
-            summary = await self._summarize(content, url, goal)
+            summary = await self._summarize(content, url, goal, tokens=tokens)
             # 如果摘要失败（403区域限制等），降级为原始内容
             if summary.startswith("[Visit] Error") or "could not be processed" in summary:
                 logger.warning(f"[Visit] Summary failed for {url}, falling back to raw content")
                 raw_content = self._format_raw_content(url, goal, content)
-                cache_manager.set("visit", cache_key, raw_content, expire_seconds=settings.cache_expiry_visit)
+                await cache_manager.set_raw(cache_key, raw_content, expire_seconds=settings.cache_expiry_visit)
                 semantic_cache.set("visit", f"{goal}:{url}", raw_content)
                 return raw_content
             # 写入缓存
-            cache_manager.set("visit", cache_key, summary, expire_seconds=settings.cache_expiry_visit)
+            await cache_manager.set_raw(cache_key, summary, expire_seconds=settings.cache_expiry_visit)
             semantic_cache.set("visit", f"{goal}:{url}", summary)
             return summary
         else:
             # 如果没有摘要客户端，直接返回截断的内容
             raw_content = self._format_raw_content(url, goal, content)
-            cache_manager.set("visit", cache_key, raw_content, expire_seconds=settings.cache_expiry_visit)
+            await cache_manager.set_raw(cache_key, raw_content, expire_seconds=settings.cache_expiry_visit)
             semantic_cache.set("visit", f"{goal}:{url}", raw_content)
             return raw_content
     
@@ -169,11 +233,14 @@ class VisitTool(BaseTool):
         for attempt in range(max_retries):
             try:
                 headers = {"Authorization": f"Bearer {self.jina_api_key}"}
-                
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+
+                # 共享会话: 复用连接池, 重试不再重复付 TCP+TLS 握手成本
+                session = get_aiohttp_session()
+                async with self._fetch_sem:
                     async with session.get(
                         f"https://r.jina.ai/{url}",
-                        headers=headers
+                        headers=headers,
+                        timeout=timeout
                     ) as response:
                         if response.status == 200:
                             return await response.text()
@@ -189,12 +256,20 @@ class VisitTool(BaseTool):
         
         return None
     
-    async def _summarize(self, content: str, url: str, goal: str) -> str:
-        """使用LLM摘要内容 (支持 Map-Reduce 处理长文本)"""
+    async def _summarize(self, content: str, url: str, goal: str,
+                         tokens: Optional[List[int]] = None) -> str:
+        """使用LLM摘要内容 (支持 Map-Reduce 处理长文本)
+
+        tokens: 上游截断阶段已有的编码结果, 传入可免去整页重新 BPE。
+        """
         # 定义分次摘要的阈值 (约 25,000 tokens)
         CHUNK_SIZE = 25000
-        tokens = self.encoding.encode(content)
-        
+        # 同样利用字符数下界: 短内容无需编码即可确定走单段摘要
+        if tokens is None and len(content) <= CHUNK_SIZE:
+            return await self._summarize_chunk(content, url, goal)
+        if tokens is None:
+            tokens = self.encoding.encode_ordinary(content)
+
         if len(tokens) <= CHUNK_SIZE:
             return await self._summarize_chunk(content, url, goal)
         
@@ -230,29 +305,43 @@ class VisitTool(BaseTool):
             prompt = build_extractor_prompt(content, goal)
         
         try:
-            response = await self.summary_client.chat.completions.create(
-                model=self.summary_model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3 if is_reduction else 0.7
-            )
-            raw = response.choices[0].message.content
+            # 流式消费: 顶层 JSON 一旦闭合就关闭流, 不为 JSON 之后的
+            # 尾部说明文本付生成延迟和 token 费用
+            scanner = _JsonStreamScanner()
+            parts = []
+            async with self._llm_sem:
+                stream = await self.summary_client.chat.completions.create(
+                    model=self.summary_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.3 if is_reduction else 0.7,
+                    stream=True
+                )
+                async for event in stream:
+                    delta = event.choices[0].delta.content if event.choices else None
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    if scanner.feed(delta):
+                        await stream.close()
+                        break
+            raw = "".join(parts)
             
             # 解析JSON响应
             raw = raw.replace("```json", "").replace("```", "").strip()
             
             try:
-                parsed = json.loads(raw)
+                parsed = _json_loads(raw)
                 if is_partial:
                     # 返回中间部分的摘要，供聚合使用
                     return f"Evidence:\n{parsed.get('evidence')}\nSummary:\n{parsed.get('summary')}"
                 return self._format_summary(url, goal, parsed)
-            except json.JSONDecodeError:
+            except _JSON_DECODE_ERROR:
                 # 尝试提取JSON
                 left = raw.find('{')
                 right = raw.rfind('}')
                 if left != -1 and right != -1 and left <= right:
                     try:
-                        parsed = json.loads(raw[left:right+1])
+                        parsed = _json_loads(raw[left:right+1])
                         if is_partial:
                             return f"Evidence:\n{parsed.get('evidence')}\nSummary:\n{parsed.get('summary')}"
                         return self._format_summary(url, goal, parsed)
@@ -269,7 +358,7 @@ class VisitTool(BaseTool):
             # 返回标记错误，由 _process_single_url 决定是否降级
             return f"[Visit] Error: {error_str}"
     
-    def _truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+    def _truncate_to_tokens(self, text: str, max_tokens: int) -> "tuple[str, List[int]]":
         """截断文本到指定token数
         
         Args:
@@ -277,14 +366,19 @@ class VisitTool(BaseTool):
             max_tokens: 最大token数
             
         Returns:
-            截断后的文本
+            (截断后的文本, 对应的 token 列表; 未编码时为 None)
         """
-        tokens = self.encoding.encode(text)
+        # 快速路径: 每 token 至少 1 字符, 字符数不超限则 token 数必然不超限,
+        # 直接跳过整页 BPE 编码
+        if len(text) <= max_tokens:
+            return text, None
+
+        tokens = self.encoding.encode_ordinary(text)
         if len(tokens) <= max_tokens:
-            return text
-        
+            return text, tokens
+
         truncated_tokens = tokens[:max_tokens]
-        return self.encoding.decode(truncated_tokens)
+        return self.encoding.decode(truncated_tokens), truncated_tokens
     
     def _format_summary(self, url: str, goal: str, parsed: Dict) -> str:
         """格式化摘要结果
@@ -297,10 +391,11 @@ class VisitTool(BaseTool):
         Returns:
             格式化的摘要字符串
         """
-        result = f"The useful information in {url} for user goal {goal} as follows:\n\n"
-        result += f"Evidence in page:\n{parsed.get('evidence', 'No evidence extracted')}\n\n"
-        result += f"Summary:\n{parsed.get('summary', 'No summary available')}\n\n"
-        return result
+        return (
+            f"The useful information in {url} for user goal {goal} as follows:\n\n"
+            f"Evidence in page:\n{parsed.get('evidence', 'No evidence extracted')}\n\n"
+            f"Summary:\n{parsed.get('summary', 'No summary available')}\n\n"
+        )
     
     def _format_error(self, url: str, goal: str, error_msg: str) -> str:
         """格式化错误结果
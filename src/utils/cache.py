@@ -1,84 +1,365 @@
 """Redis 缓存管理器"""
 
+import contextlib
+import gc
 import json
 import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 from typing import Any, Optional, Union
 import pickle
+import zlib
 
-import redis
+# 序列化热路径优先走 msgspec.msgpack (C 扩展, 编码/解码远快于 pickle
+# 且载荷更小, 省 Redis 带宽), 未安装时退回 pickle
+try:
+    import msgspec
+
+    def _msgpack_enc_hook(obj: Any) -> Any:
+        # datetime 等非 msgpack 原生类型降级为 ISO 字符串
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        raise NotImplementedError(f"Unsupported cache value type: {type(obj)}")
+
+    _msgpack_encoder = msgspec.msgpack.Encoder(enc_hook=_msgpack_enc_hook)
+    _msgpack_decoder = msgspec.msgpack.Decoder()
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+# 大文本载荷 (抓取页面/搜索结果) 入库前先压缩: 文本通常缩小 3-5 倍,
+# 省 Redis 内存与网络带宽, 压缩/解压的 CPU 开销远小于省下的传输时间。
+# 优先 zstd (level=3, SIMD 实现), 未安装时退回标准库 zlib (level=1)
+try:
+    import zstandard as zstd
+    _zstd_cctx = zstd.ZstdCompressor(level=3, threads=-1)
+    _zstd_dctx = zstd.ZstdDecompressor()
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+import redis.asyncio as redis
 from config import settings
 from src.utils.logger import logger
 
+# 键材料序列化优先走 orjson (C 扩展, 直接产出 bytes 省去 encode)
+try:
+    import orjson
+    def _key_bytes(data: Any) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+except ImportError:
+    def _key_bytes(data: Any) -> bytes:
+        # 紧凑分隔符对齐 orjson 输出, 两种环境生成相同的键
+        return json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+
+# 缓存键只需均匀分布, 不需要密码学强度; 优先 xxh3 (比 md5 快一个量级),
+# 未安装时退回标准库 blake2b (仍明显快于 md5)
+try:
+    import xxhash
+    _key_digest = xxhash.xxh3_128_hexdigest
+except ImportError:
+    def _key_digest(data: bytes) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
 
 class CacheManager:
-    """Redis 缓存管理器
-    
+    """Redis 缓存管理器 (异步连接池)
+
     用于在多轮研究过程中缓存工具调用结果，减少 API 消耗并提高性能。
+    所有操作走 redis.asyncio 共享连接池, 并发工具调用互不阻塞且不占事件循环。
     """
-    
+
+    # 定长属性布局: 热路径 get/set 上省去逐实例 __dict__ 查找
+    __slots__ = ("redis_client", "enabled", "_l1")
+
     _instance = None
-    
+    _lock = threading.Lock()
+
+    # 进程内 L1 参数: 同一会话内重复读直接命中内存, 免去 Redis RTT
+    L1_MAX_SIZE = 2048
+    L1_TTL = 60.0
+
     def __new__(cls):
+        # 双重检查锁: 首次并发构造 (如 FastAPI 线程池) 不会重复建连接池
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            try:
-                cls._instance.redis_client = redis.from_url(settings.redis_url)
-                # 测试连接
-                cls._instance.redis_client.ping()
-                cls._instance.enabled = True
-            except Exception as e:
-                logger.warning(f"Redis connection failed: {e}. Caching disabled.")
-                cls._instance.enabled = False
+            with cls._lock:
+                if cls._instance is None:
+                    inst = super().__new__(cls)
+                    pool = redis.ConnectionPool.from_url(
+                        settings.redis_url, max_connections=32, decode_responses=False
+                    )
+                    inst.redis_client = redis.Redis(connection_pool=pool)
+                    # L1: 已生成键 → (过期时刻, 值) 的 LRU
+                    inst._l1 = OrderedDict()
+                    # 乐观启用; 连接失败在 ping 或首次操作时捕获并禁用
+                    # (异步客户端无法像旧同步版那样在导入时探测)
+                    inst.enabled = True
+                    cls._instance = inst
         return cls._instance
+
+    async def ping(self) -> bool:
+        """启动健康检查: 连接失败则禁用缓存"""
+        if not self.enabled:
+            return False
+        try:
+            await self.redis_client.ping()
+            return True
+        except Exception as e:
+            logger.warning(f"Redis connection failed: {e}. Caching disabled.")
+            self.enabled = False
+            return False
+
+    async def aclose(self):
+        """关闭连接池 (应用退出时调用)"""
+        await self.redis_client.aclose()
+
+    def _handle_error(self, op: str, e: Exception):
+        """连接类错误禁用缓存 (避免每次调用都重试+报错), 其余仅记录"""
+        if isinstance(e, redis.ConnectionError):
+            logger.warning(f"Redis connection failed: {e}. Caching disabled.")
+            self.enabled = False
+        else:
+            logger.error(f"Cache {op} error: {e}")
     
+    # 超过此大小的载荷在编解码期间关闭循环 GC: 反序列化产生的大量小对象
+    # 会触发 GC 扫描, 而序列化数据本身无环, 关掉只降尾延迟无正确性风险
+    _NO_GC_THRESHOLD = 16 * 1024
+
+    # 压缩标记 (载荷首字节) 与触发阈值: 小载荷压缩收益抵不过 CPU 开销,
+    # 原样直写; 首字节不属于任何标记的视为历史无标记条目
+    _RAW_MARKER = b"\x00"
+    _ZSTD_MARKER = b"\x01"
+    _ZLIB_MARKER = b"\x02"
+    _COMPRESS_THRESHOLD = 4096
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _no_gc():
+        was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            yield
+        finally:
+            if was_enabled:
+                gc.enable()
+
+    @classmethod
+    def _serialize(cls, value: Any) -> bytes:
+        """序列化缓存值 (优先 msgpack, 非常规类型退回 pickle; 大载荷压缩)"""
+        data = None
+        if MSGSPEC_AVAILABLE:
+            try:
+                data = _msgpack_encoder.encode(value)
+            except (NotImplementedError, TypeError):
+                pass
+        if data is None:
+            data = pickle.dumps(value)
+
+        if len(data) > cls._COMPRESS_THRESHOLD:
+            if ZSTD_AVAILABLE:
+                return cls._ZSTD_MARKER + _zstd_cctx.compress(data)
+            return cls._ZLIB_MARKER + zlib.compress(data, 1)
+        return cls._RAW_MARKER + data
+
+    @staticmethod
+    def _decode(data: bytes) -> Any:
+        """反序列化缓存值 (兼容历史 pickle 条目直至 TTL 过期)"""
+        if MSGSPEC_AVAILABLE:
+            try:
+                return _msgpack_decoder.decode(data)
+            except msgspec.DecodeError:
+                pass
+        return pickle.loads(data)
+
+    @classmethod
+    def _deserialize(cls, data: bytes) -> Any:
+        """反序列化入口: 按标记解压, 大载荷解码期间暂停循环 GC 以降低尾延迟"""
+        marker = data[:1]
+        if marker == cls._RAW_MARKER:
+            data = data[1:]
+        elif marker == cls._ZSTD_MARKER:
+            if not ZSTD_AVAILABLE:
+                raise ValueError("zstd-compressed cache entry but zstandard not installed")
+            data = _zstd_dctx.decompress(data[1:])
+        elif marker == cls._ZLIB_MARKER:
+            data = zlib.decompress(data[1:])
+        # 其余首字节: 无标记的历史条目, 整体按原样解码直至 TTL 过期
+
+        if len(data) > cls._NO_GC_THRESHOLD:
+            with cls._no_gc():
+                return cls._decode(data)
+        return cls._decode(data)
+
+    def _l1_get(self, key: str) -> Optional[Any]:
+        """L1 查找: 命中置新, 过期即删"""
+        entry = self._l1.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._l1[key]
+            return None
+        self._l1.move_to_end(key)
+        return value
+
+    def _l1_put(self, key: str, value: Any):
+        """L1 写入: 超限淘汰最久未用"""
+        self._l1[key] = (time.monotonic() + self.L1_TTL, value)
+        self._l1.move_to_end(key)
+        if len(self._l1) > self.L1_MAX_SIZE:
+            self._l1.popitem(last=False)
+
     def _generate_key(self, prefix: str, data: Any) -> str:
         """生成唯一的缓存键"""
-        if isinstance(data, (dict, list)):
-            data_str = json.dumps(data, sort_keys=True)
+        # 最常见键是单个查询/URL 字符串, 前置精确类型判断直通编码
+        if type(data) is str:
+            data_bytes = data.encode()
+        elif type(data) is bytes:
+            data_bytes = data
+        elif isinstance(data, (dict, list)):
+            data_bytes = _key_bytes(data)
         else:
-            data_str = str(data)
-        
-        hash_str = hashlib.md5(data_str.encode()).hexdigest()
-        return f"xsmart:{prefix}:{hash_str}"
+            data_bytes = str(data).encode()
+
+        hash_str = _key_digest(data_bytes)
+        # v2 命名空间: 与旧 md5 键隔离, 灰度期间互不污染
+        return f"xsmart:v2:{prefix}:{hash_str}"
     
-    def get(self, prefix: str, key_data: Any) -> Optional[Any]:
+    def make_key(self, prefix: str, key_data: Any) -> str:
+        """预生成完整缓存键, 供 get_raw/set_raw 复用
+
+        同一工具调用内 get 未命中后紧接 set 同一键, 预生成可省一次
+        JSON 序列化 + 哈希。
+        """
+        return self._generate_key(prefix, key_data)
+
+    async def get(self, prefix: str, key_data: Any) -> Optional[Any]:
         """获取缓存"""
         if not self.enabled:
             return None
-        
+        return await self.get_raw(self._generate_key(prefix, key_data))
+
+    async def get_raw(self, key: str) -> Optional[Any]:
+        """按预生成键获取缓存 (跳过键构造)"""
+        if not self.enabled:
+            return None
+
+        # L1 命中: 微秒级返回, 不出进程
+        cached = self._l1_get(key)
+        if cached is not None:
+            return cached
+
         try:
-            key = self._generate_key(prefix, key_data)
-            data = self.redis_client.get(key)
+            data = await self.redis_client.get(key)
             if data:
-                return pickle.loads(data)
+                value = self._deserialize(data)
+                self._l1_put(key, value)
+                return value
         except Exception as e:
-            logger.error(f"Cache get error: {e}")
-        
+            self._handle_error("get", e)
+
         return None
-    
-    def set(self, prefix: str, key_data: Any, value: Any, expire_seconds: int = None) -> bool:
+
+    async def set(self, prefix: str, key_data: Any, value: Any, expire_seconds: int = None) -> bool:
         """设置缓存"""
         if not self.enabled:
             return False
-        
+        return await self.set_raw(self._generate_key(prefix, key_data), value, expire_seconds)
+
+    async def set_raw(self, key: str, value: Any, expire_seconds: int = None) -> bool:
+        """按预生成键设置缓存 (跳过键构造)"""
+        if not self.enabled:
+            return False
+
+        self._l1_put(key, value)
+
         try:
-            key = self._generate_key(prefix, key_data)
-            data = pickle.dumps(value)
-            return self.redis_client.set(key, data, ex=expire_seconds)
+            data = self._serialize(value)
+            return await self.redis_client.set(key, data, ex=expire_seconds)
         except Exception as e:
-            logger.error(f"Cache set error: {e}")
+            self._handle_error("set", e)
             return False
-    
-    def delete(self, prefix: str, key_data: Any) -> bool:
+
+    async def mget(self, prefix: str, keys_data: list) -> list:
+        """批量获取缓存 (单次 pipeline 往返, 代替 N 次 RTT)
+
+        Returns:
+            与 keys_data 等长的列表, 未命中位置为 None
+        """
+        if not self.enabled or not keys_data:
+            return [None] * len(keys_data)
+
+        keys = [self._generate_key(prefix, key_data) for key_data in keys_data]
+        results = [self._l1_get(key) for key in keys]
+        miss_indices = [i for i, r in enumerate(results) if r is None]
+        if not miss_indices:
+            return results
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for i in miss_indices:
+                pipe.get(keys[i])
+            raw = await pipe.execute()
+            for i, data in zip(miss_indices, raw):
+                if data:
+                    value = self._deserialize(data)
+                    self._l1_put(keys[i], value)
+                    results[i] = value
+            return results
+        except Exception as e:
+            self._handle_error("mget", e)
+            return results
+
+    async def mset(self, prefix: str, items: list) -> bool:
+        """批量设置缓存
+
+        Args:
+            items: (key_data, value, expire_seconds) 三元组列表
+        """
+        if not self.enabled or not items:
+            return False
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key_data, value, expire_seconds in items:
+                key = self._generate_key(prefix, key_data)
+                self._l1_put(key, value)
+                pipe.set(key, self._serialize(value), ex=expire_seconds)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            self._handle_error("mset", e)
+            return False
+
+    async def mdelete(self, prefix: str, keys_data: list) -> int:
+        """批量删除缓存, 返回删除条数"""
+        if not self.enabled or not keys_data:
+            return 0
+
+        keys = [self._generate_key(prefix, key_data) for key_data in keys_data]
+        for key in keys:
+            self._l1.pop(key, None)
+
+        try:
+            return int(await self.redis_client.delete(*keys))
+        except Exception as e:
+            self._handle_error("mdelete", e)
+            return 0
+
+    async def delete(self, prefix: str, key_data: Any) -> bool:
         """删除缓存"""
         if not self.enabled:
             return False
-        
+
+        key = self._generate_key(prefix, key_data)
+        self._l1.pop(key, None)
+
         try:
-            key = self._generate_key(prefix, key_data)
-            return bool(self.redis_client.delete(key))
+            return bool(await self.redis_client.delete(key))
         except Exception as e:
-            logger.error(f"Cache delete error: {e}")
+            self._handle_error("delete", e)
             return False
 
 
@@ -1,34 +1,44 @@
 """健康检查工具函数"""
 
+import asyncio
 import os
 import shutil
+import time
 import pymysql
 from typing import Optional, Dict, Any
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 from src.utils.logger import logger
+from src.utils.db_pool import get_pooled_connection, DBUTILS_AVAILABLE
 
 load_dotenv()
 
+# dbutils 缺失时的长连接: ping(reconnect=True) 复活断线,
+# 高频探活不再每次付完整握手
+_mysql_conn = None
 
-async def check_mysql_connection() -> Dict[str, Any]:
-    """
-    检查 MySQL 数据库连接
-    
-    Returns:
-        ComponentHealth: 数据库连接状态
-    """
-    try:
-        # 获取数据库配置
-        host = os.getenv("DB_HOST", "localhost")
-        port = int(os.getenv("DB_PORT", 3306))
-        user = os.getenv("DB_USER", "root")
-        password = os.getenv("DB_PASSWORD", "")
-        db_name = os.getenv("DB_NAME", "xsmartdeepresearch")
-        
-        # 尝试连接
-        conn = pymysql.connect(
+# Redis 探活共享客户端: 连接池常驻, 每次探活只发一条 PING
+_redis_client = None
+
+# 磁盘用量短 TTL 缓存: 高频 /health 探活不必每次都发 statvfs 系统调用
+_du_cache = {"ts": 0.0, "val": None}
+_DU_TTL = 2.0
+
+
+def _ping_mysql(host: str, port: int, user: str, password: str, db_name: str):
+    """借池中热连接 (或模块级长连接) 做一次 ping"""
+    if DBUTILS_AVAILABLE:
+        conn = get_pooled_connection(host, port, user, password, db_name)
+        try:
+            conn.ping(reconnect=True)
+        finally:
+            conn.close()
+        return
+
+    global _mysql_conn
+    if _mysql_conn is None:
+        _mysql_conn = pymysql.connect(
             host=host,
             port=port,
             user=user,
@@ -36,22 +46,38 @@ async def check_mysql_connection() -> Dict[str, Any]:
             database=db_name,
             connect_timeout=5
         )
-        
-        # 执行简单查询验证
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1")
-        cursor.fetchone()
-        cursor.close()
-        conn.close()
-        
+    _mysql_conn.ping(reconnect=True)
+
+
+async def check_mysql_connection() -> Dict[str, Any]:
+    """
+    检查 MySQL 数据库连接
+
+    Returns:
+        ComponentHealth: 数据库连接状态
+    """
+    # 获取数据库配置
+    host = os.getenv("DB_HOST", "localhost")
+    port = int(os.getenv("DB_PORT", 3306))
+    user = os.getenv("DB_USER", "root")
+    password = os.getenv("DB_PASSWORD", "")
+    db_name = os.getenv("DB_NAME", "xsmartdeepresearch")
+
+    try:
+        # 阻塞的 socket I/O 走线程, 不卡事件循环
+        await asyncio.to_thread(_ping_mysql, host, port, user, password, db_name)
+
         return {
             "result": "succeed",
             "message": "MySQL connection OK",
             "details": {"host": host, "database": db_name}
         }
-        
+
     except Exception as e:
-        logger.error(f"MySQL health check failed: {e}")
+        logger.error("MySQL health check failed: %s", e)
+        # 长连接已失效则丢弃, 下次探活重建
+        global _mysql_conn
+        _mysql_conn = None
         return {
             "result": "fail",
             "message": f"MySQL connection failed: {str(e)}"
@@ -69,14 +95,20 @@ async def check_disk_space(threshold: float = 0.1) -> Dict[str, Any]:
         ComponentHealth: 磁盘空间状态
     """
     try:
-        # 获取根目录磁盘使用情况
-        total, used, free = shutil.disk_usage("/")
-        
+        # 获取根目录磁盘使用情况 (短 TTL 内直接用缓存值)
+        now = time.monotonic()
+        if _du_cache["val"] is not None and now - _du_cache["ts"] < _DU_TTL:
+            total, used, free = _du_cache["val"]
+        else:
+            total, used, free = shutil.disk_usage("/")
+            _du_cache["ts"] = now
+            _du_cache["val"] = (total, used, free)
+
         # 计算使用率和剩余空间
         free_ratio = free / total
         usage_percent = (used / total) * 100
-        free_gb = free // (2**30)  # 转换为 GB
-        total_gb = total // (2**30)
+        free_gb = free >> 30  # 转换为 GB
+        total_gb = total >> 30
         
         # 判断是否满足阈值
         is_ok = free_ratio > threshold
@@ -93,7 +125,7 @@ async def check_disk_space(threshold: float = 0.1) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"Disk space check failed: {e}")
+        logger.error("Disk space check failed: %s", e)
         return {
             "result": "fail",
             "message": f"Disk check failed: {str(e)}"
@@ -116,14 +148,15 @@ async def check_redis_connection() -> Optional[Dict[str, Any]]:
     
     try:
         import redis.asyncio as redis
-        
-        # 解析 Redis URL 并连接
-        client = redis.from_url(redis_url, socket_connect_timeout=5)
-        
+
+        # 复用模块级客户端: 连接留在池中, 探活不再重复 DNS+TCP+AUTH
+        global _redis_client
+        if _redis_client is None:
+            _redis_client = redis.from_url(redis_url, socket_connect_timeout=5)
+
         # 执行 PING 测试
-        await client.ping()
-        await client.close()
-        
+        await _redis_client.ping()
+
         return {
             "result": "succeed",
             "message": "Redis connection OK",
@@ -136,7 +169,7 @@ async def check_redis_connection() -> Optional[Dict[str, Any]]:
         return None
         
     except Exception as e:
-        logger.error(f"Redis health check failed: {e}")
+        logger.error("Redis health check failed: %s", e)
         return {
             "result": "fail",
             "message": f"Redis connection failed: {str(e)}"
@@ -0,0 +1,40 @@
+"""共享 aiohttp 会话 - 跨工具复用连接池与 DNS 缓存
+
+每次调用都新建 ClientSession 会为每个请求付一次 TCP+TLS 握手;
+这里维护进程级单例, Serper/Jina 等外呼共享 keep-alive 连接。
+"""
+
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_aiohttp_session() -> aiohttp.ClientSession:
+    """获取共享会话 (懒创建; 事件循环切换后自动重建)"""
+    global _session, _session_loop
+
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=20,
+                keepalive_timeout=75,
+                ttl_dns_cache=300,
+            )
+        )
+        _session_loop = loop
+    return _session
+
+
+async def close_aiohttp_session() -> None:
+    """关闭共享会话 (应用退出时调用)"""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
@@ -3,8 +3,8 @@ import pymysql
 import uuid
 import os
 import json
-from datetime import datetime
 from src.utils.logger import logger
+from src.utils.db_pool import get_pooled_connection
 from src.utils.session_manager import SessionManager
 
 class ProjectManager:
@@ -20,13 +20,9 @@ class ProjectManager:
         self.db_name = self.sm.db_name
         
     def _get_connection(self):
-        return pymysql.connect(
-            host=self.host,
-            port=self.port,
-            user=self.user,
-            password=self.password,
-            database=self.db_name,
-            cursorclass=pymysql.cursors.DictCursor
+        # 池化连接: close() 即归还, 各方法的 finally 清理逻辑不变
+        return get_pooled_connection(
+            self.host, self.port, self.user, self.password, self.db_name
         )
 
     def create_project(self, name: str, description: str = "") -> str:
@@ -45,7 +41,7 @@ class ProjectManager:
             conn.commit()
             return project_id
         except Exception as e:
-            logger.error(f"Failed to create project: {e}")
+            logger.error("Failed to create project: %s", e)
             return None
         finally:
             if conn:
@@ -58,21 +54,17 @@ class ProjectManager:
             conn = self._get_connection()
             cursor = conn.cursor()
             
+            # 时间戳在 SQL 层直接格式化为 ISO 字符串, 省去逐行 Python 转换
             cursor.execute(
-                "SELECT * FROM projects WHERE status = %s ORDER BY updated_at DESC", 
+                "SELECT id, name, description, status, "
+                "DATE_FORMAT(created_at, '%%Y-%%m-%%dT%%H:%%i:%%s') AS created_at, "
+                "DATE_FORMAT(updated_at, '%%Y-%%m-%%dT%%H:%%i:%%s') AS updated_at "
+                "FROM projects WHERE status = %s ORDER BY updated_at DESC",
                 (status,)
             )
-            rows = cursor.fetchall()
-            
-            for row in rows:
-                if isinstance(row.get('updated_at'), datetime):
-                    row['updated_at'] = row['updated_at'].isoformat()
-                if isinstance(row.get('created_at'), datetime):
-                    row['created_at'] = row['created_at'].isoformat()
-                    
-            return rows
+            return cursor.fetchall()
         except Exception as e:
-            logger.error(f"Failed to list projects: {e}")
+            logger.error("Failed to list projects: %s", e)
             return []
         finally:
             if conn:
@@ -85,21 +77,17 @@ class ProjectManager:
             conn = self._get_connection()
             cursor = conn.cursor()
             
+            # 时间戳在 SQL 层直接格式化为 ISO 字符串, 省去逐行 Python 转换
             cursor.execute(
-                "SELECT * FROM sessions WHERE project_id = %s ORDER BY updated_at DESC",
+                "SELECT id, title, intent_category, project_id, tags, "
+                "DATE_FORMAT(created_at, '%%Y-%%m-%%dT%%H:%%i:%%s') AS created_at, "
+                "DATE_FORMAT(updated_at, '%%Y-%%m-%%dT%%H:%%i:%%s') AS updated_at "
+                "FROM sessions WHERE project_id = %s ORDER BY updated_at DESC",
                 (project_id,)
             )
-            rows = cursor.fetchall()
-            
-            for row in rows:
-                if isinstance(row.get('updated_at'), datetime):
-                    row['updated_at'] = row['updated_at'].isoformat()
-                if isinstance(row.get('created_at'), datetime):
-                    row['created_at'] = row['created_at'].isoformat()
-                    
-            return rows
+            return cursor.fetchall()
         except Exception as e:
-            logger.error(f"Failed to get project sessions: {e}")
+            logger.error("Failed to get project sessions: %s", e)
             return []
         finally:
             if conn:
@@ -107,18 +95,25 @@ class ProjectManager:
 
     def add_project_memory(self, project_id: str, key_fact: str, source_session_id: str = None):
         """向项目注入新的知识上下文"""
+        self.add_project_memories(project_id, [key_fact], source_session_id)
+
+    def add_project_memories(self, project_id: str, key_facts: List[str],
+                             source_session_id: str = None):
+        """批量注入知识上下文 (一次 executemany + 一次 commit, 免去逐条往返)"""
+        if not key_facts:
+            return
         conn = None
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
-            
-            cursor.execute(
+
+            cursor.executemany(
                 "INSERT INTO project_memories (project_id, key_fact, source_session_id) VALUES (%s, %s, %s)",
-                (project_id, key_fact, source_session_id)
+                [(project_id, fact, source_session_id) for fact in key_facts]
             )
             conn.commit()
         except Exception as e:
-            logger.error(f"Failed to add memory: {e}")
+            logger.error("Failed to add memories: %s", e)
         finally:
             if conn:
                 conn.close()
@@ -145,7 +140,7 @@ class ProjectManager:
             return context
             
         except Exception as e:
-            logger.error(f"Failed to get context: {e}")
+            logger.error("Failed to get context: %s", e)
             return ""
         finally:
             if conn:
@@ -159,23 +154,24 @@ class ProjectManager:
             conn = self._get_connection()
             cursor = conn.cursor()
             
-            cursor.execute("SELECT id FROM projects WHERE id = %s", (default_id,))
-            if not cursor.fetchone():
-                cursor.execute(
-                    "INSERT INTO projects (id, name, description) VALUES (%s, %s, %s)",
-                    (default_id, "Default Project", "Auto-created for legacy sessions")
-                )
-                conn.commit()
-                cursor.execute(
-                    "UPDATE sessions SET project_id = %s WHERE project_id IS NULL",
-                    (default_id,)
-                )
-                conn.commit()
-                logger.info("✅ Migrated legacy sessions to Default Project")
-            
+            # INSERT IGNORE 合并存在性检查与插入, 与迁移 UPDATE 共用一次
+            # 事务提交 (原来最多 4 次往返: SELECT + INSERT + UPDATE + 2 commit)
+            cursor.execute(
+                "INSERT IGNORE INTO projects (id, name, description) VALUES (%s, %s, %s)",
+                (default_id, "Default Project", "Auto-created for legacy sessions")
+            )
+            cursor.execute(
+                "UPDATE sessions SET project_id = %s WHERE project_id IS NULL",
+                (default_id,)
+            )
+            migrated = cursor.rowcount
+            conn.commit()
+            if migrated > 0:
+                logger.info("✅ Migrated %d legacy sessions to Default Project", migrated)
+
             return default_id
         except Exception as e:
-            logger.error(f"Default project check failed: {e}")
+            logger.error("Default project check failed: %s", e)
             return None
         finally:
             if conn:
@@ -1,8 +1,21 @@
-"""语义缓存工具 - 基于 ChromaDB 和向量嵌入实现模糊匹配缓存"""
+"""语义缓存工具 - 基于向量嵌入实现模糊匹配缓存
+
+优先使用进程内 FAISS IndexFlatIP (L2 归一化后内积即余弦相似度, 百条级
+查询 <1ms); faiss 不可用时回退到 ChromaDB, 两者都缺失则禁用缓存。
+"""
 
 import os
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, Any, List, Optional, Union
-import json
+
+try:
+    import faiss
+    import numpy as np
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
 
 try:
     import chromadb
@@ -12,112 +25,391 @@ except ImportError:
     CHROMA_AVAILABLE = False
 
 from src.utils.logger import logger
+from src.utils.cache import _key_digest
 from config import settings
 
 
 class SemanticCacheManager:
     """语义缓存管理器
-    
+
     用于存储和检索具有相似含义的工具执行结果。
     """
-    
-    def __init__(self, persist_directory: str = "./.chroma_cache"):
-        self.enabled = CHROMA_AVAILABLE
+
+    # query→document 余弦相似度的经验阈值; 超过则视为命中
+    SIM_THRESHOLD = 0.40
+    # 近重复阈值: set 时相似度超过即合并到已有条目, 不新增向量
+    DUP_THRESHOLD = 0.95
+    # 写缓冲参数: 单条 set 聚批后一次嵌入, 批满或定时到期时落盘
+    FLUSH_BATCH = 64
+    FLUSH_INTERVAL = 0.2
+    # 嵌入记忆表容量: get 未命中后紧接 set 同一查询, 前向只算一次
+    EMB_CACHE_SIZE = 512
+
+    def __init__(self, persist_directory: str = "./.chroma_cache",
+                 max_size: int = 10_000, ttl_seconds: float = 7 * 24 * 3600):
+        self.enabled = FAISS_AVAILABLE or CHROMA_AVAILABLE
         self.persist_directory = persist_directory
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
         self._client = None
         self._collection = None
         self._embedding_fn = None
         self._initialized = False
+        # FAISS 后端状态: 索引 + 按 faiss id 键入的 LRU 条目表
+        self._index = None
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._embed_model = None
+        # 命中率统计, 每 1000 次查询记录一次便于调阈值
+        self.hits = 0
+        self.misses = 0
+        # 嵌入记忆表: 文本 → 归一化向量 (LRU), 同一文本不重复过前向
+        self._emb_cache: "OrderedDict[str, Any]" = OrderedDict()
+        # 写缓冲: 攒够 FLUSH_BATCH 条或 FLUSH_INTERVAL 秒后批量嵌入
+        self._buffer: List[tuple] = []
+        self._buf_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        # 状态锁: to_thread 的读、定时器/后台线程的写会并发进来, FAISS
+        # 索引的 add/remove 与 search 并发会崩进程, 条目/嵌入 LRU 也会
+        # 竞争; 所有 _faiss_* 及嵌入记忆表操作都在此锁内
+        self._state_lock = threading.Lock()
 
     def _lazy_init(self):
         """延迟初始化，避免启动时因网络问题崩溃"""
         if self._initialized or not self.enabled:
             return
-            
+        with self._state_lock:
+            self._lazy_init_locked()
+
+    def _lazy_init_locked(self):
+        """持有 _state_lock 时的初始化主体 (双检避免并发重复建索引)"""
+        if self._initialized:
+            return
+
         try:
-            import chromadb
-            from chromadb.utils import embedding_functions
-            
             # Use local model cache (pre-downloaded in Docker image)
             # Prevent any network calls to HuggingFace
             os.environ.setdefault("HF_HUB_OFFLINE", "1")
             os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
-            
-            logger.info("Initializing semantic cache (lazy)...")
-            self._client = chromadb.PersistentClient(path=self.persist_directory)
-            
-            # Model is pre-cached at /app/.hf_cache in Docker image
-            cache_dir = os.environ.get("HF_HOME", "/app/.hf_cache")
-            self._embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name="all-MiniLM-L6-v2"
-            )
-            
-            self._collection = self._client.get_or_create_collection(
-                name="tool_results",
-                embedding_function=self._embedding_fn
-            )
+
+            if FAISS_AVAILABLE:
+                logger.info("Initializing semantic cache (faiss, lazy)...")
+                from sentence_transformers import SentenceTransformer
+
+                self._embed_model = SentenceTransformer("all-MiniLM-L6-v2")
+                if settings.embed_dtype == "int8":
+                    # int8 动态量化: Linear 层权重降为 qint8, CPU 上前向
+                    # 约 2-3x 吞吐且召回损失可忽略; 失败时保持 fp32
+                    try:
+                        import torch
+                        self._embed_model = torch.ao.quantization.quantize_dynamic(
+                            self._embed_model, {torch.nn.Linear}, dtype=torch.qint8
+                        )
+                        logger.info("Semantic cache embedding model quantized to int8.")
+                    except Exception as e:
+                        logger.warning("int8 quantization unavailable (%s), keeping fp32.", e)
+                dim = self._embed_model.get_sentence_embedding_dimension()
+                # IDMap 包装以支持 LRU 淘汰时 remove_ids
+                self._index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+            else:
+                logger.info("Initializing semantic cache (chromadb, lazy)...")
+                self._client = chromadb.PersistentClient(path=self.persist_directory)
+
+                # Model is pre-cached at /app/.hf_cache in Docker image
+                self._embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
+                    model_name="all-MiniLM-L6-v2"
+                )
+
+                self._collection = self._client.get_or_create_collection(
+                    name="tool_results",
+                    embedding_function=self._embedding_fn
+                )
             self._initialized = True
             logger.info("Semantic cache initialized successfully.")
         except Exception as e:
-            logger.error(f"Failed to initialize semantic cache: {e}. Disabling for this session.")
+            logger.error("Failed to initialize semantic cache: %s. Disabling for this session.", e)
             self.enabled = False
             self._initialized = True
 
+    def _remember_embedding(self, text: str, vec: "np.ndarray"):
+        """记入嵌入 LRU, 超限淘汰最久未用"""
+        self._emb_cache[text] = vec
+        if len(self._emb_cache) > self.EMB_CACHE_SIZE:
+            self._emb_cache.popitem(last=False)
+
+    def _embed(self, text: str) -> "np.ndarray":
+        """计算 L2 归一化后的嵌入向量 (1, dim), 同一文本走记忆表"""
+        vec = self._emb_cache.get(text)
+        if vec is not None:
+            self._emb_cache.move_to_end(text)
+            return vec
+        vec = self._embed_model.encode([text], convert_to_numpy=True).astype("float32")
+        faiss.normalize_L2(vec)
+        self._remember_embedding(text, vec)
+        return vec
+
+    def _embed_many(self, texts: List[str]) -> "np.ndarray":
+        """批量计算嵌入 (n, dim); 仅记忆表未命中的文本进同一个前向 batch"""
+        missing = [t for t in dict.fromkeys(texts) if t not in self._emb_cache]
+        if missing:
+            vecs = self._embed_model.encode(missing, convert_to_numpy=True).astype("float32")
+            faiss.normalize_L2(vecs)
+            for text, vec in zip(missing, vecs):
+                self._remember_embedding(text, vec.reshape(1, -1))
+        return np.vstack([self._embed(t) for t in texts])
+
+    def _faiss_search(self, vec: "np.ndarray"):
+        """返回最相似条目的 (sim, faiss_id); 索引为空时 (0.0, -1)"""
+        if self._index.ntotal == 0:
+            return 0.0, -1
+        sims, ids = self._index.search(vec, 1)
+        return float(sims[0][0]), int(ids[0][0])
+
+    def _resolve_hit(self, tool_name: str, query: str, sim: float, idx: int) -> Optional[str]:
+        """校验检索结果: 阈值/工具/TTL 通过后 LRU 置新并返回内容"""
+        if idx < 0 or sim < self.SIM_THRESHOLD:
+            return None
+
+        entry = self._entries.get(idx)
+        if entry is None or entry["tool"] != tool_name:
+            return None
+        if entry["expires_at"] < time.monotonic():
+            self._remove_entry(idx)
+            return None
+
+        self._entries.move_to_end(idx)
+        logger.info("Semantic cache hit for [%s]: %s (sim: %.4f)", tool_name, query, sim)
+        return entry["content"]
+
+    def _faiss_get(self, tool_name: str, query: str) -> Optional[str]:
+        """FAISS 后端查找: 命中后 LRU 置新并检查 TTL"""
+        # 索引的是文档嵌入, 查询嵌入只在查找时临时计算, 不会污染缓存
+        sim, idx = self._faiss_search(self._embed(query))
+        return self._resolve_hit(tool_name, query, sim, idx)
+
+    def _faiss_get_many(self, tool_name: str, queries: List[str]) -> List[Optional[str]]:
+        """FAISS 后端批量查找: N 个查询一次嵌入 + 一次批量检索"""
+        vecs = self._embed_many(queries)
+        if self._index.ntotal == 0:
+            return [None] * len(queries)
+        sims, ids = self._index.search(vecs, 1)
+        return [
+            self._resolve_hit(tool_name, query, float(sims[i][0]), int(ids[i][0]))
+            for i, query in enumerate(queries)
+        ]
+
+    def _faiss_set(self, tool_name: str, query: str, content: str):
+        """FAISS 后端写入: 近重复合并到已有条目, 超限淘汰最久未用"""
+        vec = self._embed(query)
+        sim, idx = self._faiss_search(vec)
+        if idx >= 0 and sim > self.DUP_THRESHOLD:
+            entry = self._entries.get(idx)
+            if entry is not None and entry["tool"] == tool_name:
+                # 近重复: 刷新内容和过期时间, 不再添加新向量
+                entry["content"] = content
+                entry["expires_at"] = time.monotonic() + self.ttl_seconds
+                self._entries.move_to_end(idx)
+                return
+
+        new_id = self._next_id
+        self._next_id += 1
+        self._index.add_with_ids(vec, np.array([new_id], dtype="int64"))
+        self._entries[new_id] = {
+            "tool": tool_name,
+            "query": query,
+            "content": content,
+            "expires_at": time.monotonic() + self.ttl_seconds,
+        }
+        if len(self._entries) > self.max_size:
+            oldest_id, _ = self._entries.popitem(last=False)
+            self._index.remove_ids(np.array([oldest_id], dtype="int64"))
+
+    def _faiss_set_many(self, entries: List[tuple]):
+        """FAISS 后端批量写入: 一次 encode 所有查询, 非重复向量一次 add"""
+        vecs = self._embed_many([query for _, query, _ in entries])
+
+        new_vecs = []
+        new_ids = []
+        for (tool_name, query, content), vec in zip(entries, vecs):
+            vec = vec.reshape(1, -1)
+            sim, idx = self._faiss_search(vec)
+            if idx >= 0 and sim > self.DUP_THRESHOLD:
+                entry = self._entries.get(idx)
+                if entry is not None and entry["tool"] == tool_name:
+                    entry["content"] = content
+                    entry["expires_at"] = time.monotonic() + self.ttl_seconds
+                    self._entries.move_to_end(idx)
+                    continue
+
+            new_id = self._next_id
+            self._next_id += 1
+            new_vecs.append(vec)
+            new_ids.append(new_id)
+            self._entries[new_id] = {
+                "tool": tool_name,
+                "query": query,
+                "content": content,
+                "expires_at": time.monotonic() + self.ttl_seconds,
+            }
+
+        if new_vecs:
+            self._index.add_with_ids(np.vstack(new_vecs), np.array(new_ids, dtype="int64"))
+        while len(self._entries) > self.max_size:
+            oldest_id, _ = self._entries.popitem(last=False)
+            self._index.remove_ids(np.array([oldest_id], dtype="int64"))
+
+    def _remove_entry(self, faiss_id: int):
+        """同时从条目表与索引中删除"""
+        self._entries.pop(faiss_id, None)
+        self._index.remove_ids(np.array([faiss_id], dtype="int64"))
+
     def get(self, tool_name: str, query: str, threshold: float = 0.3) -> Optional[str]:
         """检索语义相似的缓存结果
-        
+
         Args:
             tool_name: 工具名称
             query: 查询内容
-            threshold: 距离阈值 (越小越相似)
-            
+            threshold: 距离阈值 (越小越相似, 仅 ChromaDB 后端使用)
+
         Returns:
             缓存的内容或 None
         """
         if not self.enabled:
             return None
-        
+
         if not self._initialized:
             self._lazy_init()
             if not self.enabled: return None
-            
+
+        # 先落盘写缓冲, 保证刚写入的条目立即可查
+        self._flush()
+
         try:
+            if self._index is not None:
+                with self._state_lock:
+                    result = self._faiss_get(tool_name, query)
+                if result is not None:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                total = self.hits + self.misses
+                if total % 1000 == 0:
+                    logger.info("Semantic cache hit ratio: %.2f%% (%d lookups)", 100.0 * self.hits / total, total)
+                return result
+
             results = self._collection.query(
                 query_texts=[query],
                 n_results=1,
                 where={"tool": tool_name}
             )
-            
+
             if results["documents"] and results["documents"][0] and results["distances"][0][0] < threshold:
-                logger.info(f"Semantic cache hit for [{tool_name}]: {query} (dist: {results['distances'][0][0]:.4f})")
+                logger.info("Semantic cache hit for [%s]: %s (dist: %.4f)", tool_name, query, results["distances"][0][0])
                 return results["documents"][0][0]
-                
+
         except Exception as e:
-            logger.error(f"Semantic cache retrieval failed: {e}")
-            
+            logger.error("Semantic cache retrieval failed: %s", e)
+
         return None
 
+    def get_many(self, tool_name: str, queries: List[str],
+                 threshold: float = 0.3) -> List[Optional[str]]:
+        """批量检索: N 个查询合并为一次嵌入 + 一次批量检索
+
+        Returns:
+            与 queries 等长的列表, 未命中位置为 None
+        """
+        if not queries or not self.enabled:
+            return [None] * len(queries)
+
+        if not self._initialized:
+            self._lazy_init()
+            if not self.enabled: return [None] * len(queries)
+
+        self._flush()
+
+        try:
+            if self._index is not None:
+                with self._state_lock:
+                    results = self._faiss_get_many(tool_name, queries)
+                self.hits += sum(1 for r in results if r is not None)
+                self.misses += sum(1 for r in results if r is None)
+                return results
+
+            raw = self._collection.query(
+                query_texts=queries,
+                n_results=1,
+                where={"tool": tool_name}
+            )
+            results = []
+            for docs, dists in zip(raw["documents"], raw["distances"]):
+                if docs and dists[0] < threshold:
+                    results.append(docs[0])
+                else:
+                    results.append(None)
+            return results
+        except Exception as e:
+            logger.error("Semantic cache batch retrieval failed: %s", e)
+            return [None] * len(queries)
+
     def set(self, tool_name: str, query: str, content: str):
-        """存储结果到语义缓存"""
+        """存储结果到语义缓存 (经写缓冲聚批, 批满或定时到期后批量嵌入)"""
         if not self.enabled:
             return
-            
+
+        with self._buf_lock:
+            self._buffer.append((tool_name, query, content))
+            if len(self._buffer) < self.FLUSH_BATCH:
+                if self._flush_timer is None:
+                    self._flush_timer = threading.Timer(self.FLUSH_INTERVAL, self._flush)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+                return
+        # 批满也移到后台线程落盘: set() 可能在事件循环上被同步调用,
+        # 整批嵌入前向会卡住循环几百毫秒
+        threading.Thread(target=self._flush, daemon=True).start()
+
+    def _flush(self):
+        """清空写缓冲, 一次批量嵌入写入"""
+        with self._buf_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._buffer:
+                return
+            drain, self._buffer = self._buffer, []
+        self.set_many(drain)
+
+    def set_many(self, entries: List[tuple]):
+        """批量存储结果到语义缓存
+
+        Args:
+            entries: (tool_name, query, content) 三元组列表
+
+        批量 fanout 后逐条 set 会触发 N 次嵌入计算; 这里把所有查询合并
+        到一次 encode 调用, 批内额外条目的边际成本接近于零。
+        """
+        if not entries or not self.enabled:
+            return
+
         if not self._initialized:
             self._lazy_init()
             if not self.enabled: return
-            
+
         try:
-            # 使用 query 的哈希或简单唯一 ID
-            import hashlib
-            doc_id = hashlib.md5(f"{tool_name}:{query}".encode()).hexdigest()
-            
+            if self._index is not None:
+                with self._state_lock:
+                    self._faiss_set_many(entries)
+                return
+
             self._collection.upsert(
-                ids=[doc_id],
-                documents=[content],
-                metadatas=[{"tool": tool_name, "query": query}]
+                ids=[_key_digest(f"{tool}:{query}".encode())
+                     for tool, query, _ in entries],
+                documents=[content for _, _, content in entries],
+                metadatas=[{"tool": tool, "query": query} for tool, query, _ in entries]
             )
         except Exception as e:
-            logger.error(f"Semantic cache storage failed: {e}")
+            logger.error("Semantic cache batch storage failed: %s", e)
 
 # 全局单例
 semantic_cache = SemanticCacheManager()
@@ -1,67 +1,141 @@
-import pymysql
 import json
+import pymysql
+import re
+import time
 import uuid
 import os
+from collections import OrderedDict
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from src.utils.logger import logger
+from src.utils.db_pool import get_pooled_connection
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# metadata 编解码优先走 orjson (C 扩展, 快 3-10 倍), 未安装退回标准库
+try:
+    import orjson
+
+    def _meta_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    _meta_loads = orjson.loads
+except ImportError:
+    def _meta_dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+    _meta_loads = json.loads
+
+# 导入时一次性读取 DB 配置; SessionManager 会被多处实例化
+# (API 依赖注入、ProjectManager 等), 不必每次都重走 os.getenv
+_DB_CFG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": int(os.getenv("DB_PORT", 3306)),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", ""),
+    "db_name": os.getenv("DB_NAME", "xsmartdeepresearch"),
+}
+
+# 已完成建库/建表探测的库名; 生产环境迁移若由外部管理,
+# 可设 XSDR_SKIP_DDL=1 完全跳过 DDL
+_SCHEMA_READY = set()
+_SKIP_DDL = os.getenv("XSDR_SKIP_DDL", "") == "1"
+
 class SessionManager:
     """会话管理器 - 基于 MySQL 实现远程持久化"""
-    
+
+    # 热路径 SQL 模板: 常量化保证每次下发完全相同的字节串,
+    # 也避免在循环里重复拼接
+    _SQL_INSERT_MESSAGE = (
+        "INSERT INTO messages (session_id, role, content, metadata) VALUES (%s, %s, %s, %s)"
+    )
+    _SQL_TOUCH_SESSION = "UPDATE sessions SET updated_at = CURRENT_TIMESTAMP WHERE id = %s"
+    _SQL_LIST_SESSIONS = (
+        "SELECT id, title, intent_category, project_id, created_at, updated_at "
+        "FROM sessions ORDER BY updated_at DESC LIMIT %s"
+    )
+    _SQL_SESSION_HISTORY = (
+        "SELECT id, role, content, metadata, timestamp FROM messages "
+        "WHERE session_id = %s ORDER BY id DESC LIMIT %s"
+    )
+    _SQL_SESSION_HISTORY_BEFORE = (
+        "SELECT id, role, content, metadata, timestamp FROM messages "
+        "WHERE session_id = %s AND id < %s ORDER BY id DESC LIMIT %s"
+    )
+    _SQL_INSERT_TASK = (
+        "INSERT INTO research_tasks (task_id, question, status) VALUES (%s, %s, %s)"
+    )
+
+    # 读缓存参数: 侧边栏刷新/轮询在几秒内反复拉同样的列表与历史,
+    # 进程内短 TTL 缓存挡掉这些重复 MySQL 往返; 本实例的写操作即时
+    # 失效, 其他实例/进程最多读到 TTL 内的旧值
+    _LIST_CACHE_TTL = 5.0
+    _LIST_CACHE_SIZE = 128
+    _HIST_CACHE_TTL = 10.0
+    _HIST_CACHE_SIZE = 512
+
     def __init__(self):
-        self.host = os.getenv("DB_HOST", "localhost")
-        self.port = int(os.getenv("DB_PORT", 3306))
-        self.user = os.getenv("DB_USER", "root")
-        self.password = os.getenv("DB_PASSWORD", "")
-        self.db_name = os.getenv("DB_NAME", "xsmartdeepresearch")
-        
+        self.host = _DB_CFG["host"]
+        self.port = _DB_CFG["port"]
+        self.user = _DB_CFG["user"]
+        self.password = _DB_CFG["password"]
+        self.db_name = _DB_CFG["db_name"]
+
+        # 键 → (过期时刻, 值) 的 LRU, 与 CacheManager 的 L1 同构
+        self._list_cache = OrderedDict()
+        self._hist_cache = OrderedDict()
+
         self._init_db()
         
     def _get_connection(self, db_name: str = None):
-        """获取数据库连接"""
-        return pymysql.connect(
-            host=self.host,
-            port=self.port,
-            user=self.user,
-            password=self.password,
-            database=db_name,
-            cursorclass=pymysql.cursors.DictCursor
+        """获取数据库连接 (池化: close() 即归还, 各方法的 finally 逻辑不变)
+
+        不指定 db_name 时 (仅 _init_db 的 CREATE DATABASE 用) 走独立的
+        无库小池, 与业务池互不干扰。
+        """
+        return get_pooled_connection(
+            self.host, self.port, self.user, self.password, db_name
         )
 
     def _init_db(self):
-        """初始化数据库表结构"""
+        """初始化数据库表结构 (每进程每库只探测一次)"""
+        if _SKIP_DDL or self.db_name in _SCHEMA_READY:
+            return
+        # 库名来自环境变量且要拼进 DDL, 先做白名单校验堵住注入
+        if not re.fullmatch(r"[A-Za-z0-9_]+", self.db_name):
+            logger.error(f"❌ Invalid DB_NAME: {self.db_name!r}")
+            return
         try:
             # 1. 连接 MySQL Server (不指定 DB) 检查数据库是否存在
             conn = self._get_connection()
             cursor = conn.cursor()
-            
-            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_name} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
-            conn.commit()
+
+            # 已存在则跳过 CREATE DATABASE (也不要求账号有建库权限)
+            cursor.execute("SHOW DATABASES LIKE %s", (self.db_name,))
+            if not cursor.fetchone():
+                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_name} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+                conn.commit()
             conn.close()
             
             # 2. 连接指定 DB 创建表
             conn = self._get_connection(self.db_name)
             cursor = conn.cursor()
-            
-            # 创建 Projects 表 (新)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS projects (
+
+            # 全部建表 DDL 并成一次多语句往返 (连接已开启
+            # MULTI_STATEMENTS); 语句均为 IF NOT EXISTS, 幂等
+            cursor.execute(";\n".join((
+                # Projects 表 (新)
+                """CREATE TABLE IF NOT EXISTS projects (
                     id VARCHAR(36) PRIMARY KEY,
                     name VARCHAR(255) NOT NULL,
                     description TEXT,
                     status ENUM('active', 'archived') DEFAULT 'active',
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
-
-            # 创建 Sessions 表 (原有)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS sessions (
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+                # Sessions 表 (原有)
+                """CREATE TABLE IF NOT EXISTS sessions (
                     id VARCHAR(36) PRIMARY KEY,
                     title VARCHAR(255),
                     intent_category VARCHAR(50),
@@ -70,35 +144,18 @@ class SessionManager:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                     FOREIGN KEY(project_id) REFERENCES projects(id)
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
-            
-            # 手动检查并添加列 (Migration for existing tables)
-            try:
-                cursor.execute("SELECT project_id FROM sessions LIMIT 1")
-            except:
-                logger.info("⚡ Migrating sessions table: Adding project_id and tags...")
-                cursor.execute("ALTER TABLE sessions ADD COLUMN project_id VARCHAR(36)")
-                cursor.execute("ALTER TABLE sessions ADD COLUMN tags JSON")
-                cursor.execute("ALTER TABLE sessions ADD CONSTRAINT fk_project FOREIGN KEY (project_id) REFERENCES projects(id)")
-
-            # 创建 Project Memories 表 (新)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS project_memories (
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+                # Project Memories 表 (新)
+                """CREATE TABLE IF NOT EXISTS project_memories (
                     id INT AUTO_INCREMENT PRIMARY KEY,
                     project_id VARCHAR(36),
                     key_fact TEXT,
                     source_session_id VARCHAR(36),
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
-            
-            # 创建 Messages 表 (原有)
-            
-            # 创建 Messages 表
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS messages (
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+                # Messages 表 (原有)
+                """CREATE TABLE IF NOT EXISTS messages (
                     id INT AUTO_INCREMENT PRIMARY KEY,
                     session_id VARCHAR(36),
                     role VARCHAR(50),
@@ -106,21 +163,15 @@ class SessionManager:
                     metadata JSON,
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(session_id) REFERENCES sessions(id) ON DELETE CASCADE
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
-
-            # 创建 System Settings 表
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS system_settings (
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+                # System Settings 表
+                """CREATE TABLE IF NOT EXISTS system_settings (
                     setting_key VARCHAR(50) PRIMARY KEY,
                     setting_value TEXT,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
-
-            # 创建 Research Tasks 表 (新)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS research_tasks (
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+                # Research Tasks 表 (新)
+                """CREATE TABLE IF NOT EXISTS research_tasks (
                     task_id VARCHAR(36) PRIMARY KEY,
                     question TEXT,
                     answer LONGTEXT,
@@ -131,16 +182,75 @@ class SessionManager:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                     is_bookmarked BOOLEAN DEFAULT FALSE
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
-            
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+            )))
+            while cursor.nextset():
+                pass
+
+            # 手动检查并添加列 (Migration for existing tables)
+            try:
+                cursor.execute("SELECT project_id FROM sessions LIMIT 1")
+            except:
+                logger.info("⚡ Migrating sessions table: Adding project_id and tags...")
+                cursor.execute("ALTER TABLE sessions ADD COLUMN project_id VARCHAR(36)")
+                cursor.execute("ALTER TABLE sessions ADD COLUMN tags JSON")
+                cursor.execute("ALTER TABLE sessions ADD CONSTRAINT fk_project FOREIGN KEY (project_id) REFERENCES projects(id)")
+
+
+            # 热查询索引: 各列表/历史查询按索引序直接取 LIMIT 条,
+            # 免去全表扫描 + filesort; 已存在时 ALTER 报错, 忽略即可。
+            # messages 的 (session_id, id) 访问路径由 FK 自动索引覆盖
+            # (InnoDB 二级索引隐含主键 id), 无需另建
+            for ddl in (
+                "ALTER TABLE projects ADD INDEX idx_status_updated (status, updated_at DESC)",
+                "ALTER TABLE sessions ADD INDEX idx_project_updated (project_id, updated_at DESC)",
+                "ALTER TABLE sessions ADD INDEX idx_sessions_updated (updated_at DESC)",
+                "ALTER TABLE research_tasks ADD INDEX idx_tasks_created (created_at DESC)",
+                "ALTER TABLE research_tasks ADD INDEX idx_tasks_bookmark (is_bookmarked, created_at DESC)",
+            ):
+                try:
+                    cursor.execute(ddl)
+                except Exception:
+                    pass
+
             conn.commit()
             conn.close()
+            _SCHEMA_READY.add(self.db_name)
             logger.info(f"✅ MySQL initialized: {self.db_name}")
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to init MySQL: {e}")
 
+    @staticmethod
+    def _cache_get(cache: OrderedDict, key):
+        """读缓存查找: 命中置新, 过期即删"""
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _cache_put(cache: OrderedDict, key, value, ttl: float, maxsize: int):
+        """读缓存写入: 超限淘汰最久未用"""
+        cache[key] = (time.monotonic() + ttl, value)
+        cache.move_to_end(key)
+        if len(cache) > maxsize:
+            cache.popitem(last=False)
+
+    def _invalidate_session_caches(self, session_id: str = None):
+        """写操作后失效读缓存 (列表排序随 updated_at 变动, 整体清空)"""
+        self._list_cache.clear()
+        if session_id is None:
+            self._hist_cache.clear()
+        else:
+            for key in [k for k in self._hist_cache if k[0] == session_id]:
+                del self._hist_cache[key]
+
     def create_session(self, title: str, intent_category: str = "general", project_id: str = None) -> str:
         """创建新会话"""
         session_id = str(uuid.uuid4())
@@ -155,6 +265,7 @@ class SessionManager:
             )
             
             conn.commit()
+            self._invalidate_session_caches(session_id)
             return session_id
         except Exception as e:
             logger.error(f"Failed to create session: {e}")
@@ -170,34 +281,71 @@ class SessionManager:
             conn = self._get_connection(self.db_name)
             cursor = conn.cursor()
             
-            meta_json = json.dumps(metadata, ensure_ascii=False) if metadata else "{}"
+            # 空 metadata 直接存 NULL, 省去无意义的 "{}" 编解码
+            meta_json = _meta_dumps(metadata) if metadata else None
             
+            # 多语句一次下发: INSERT 与会话时间戳 touch 并成一次网络往返
+            # (连接已开启 CLIENT.MULTI_STATEMENTS)
             cursor.execute(
-                "INSERT INTO messages (session_id, role, content, metadata) VALUES (%s, %s, %s, %s)",
-                (session_id, role, content, meta_json)
+                self._SQL_INSERT_MESSAGE + "; " + self._SQL_TOUCH_SESSION,
+                (session_id, role, content, meta_json, session_id)
             )
-            
-            cursor.execute("UPDATE sessions SET updated_at = CURRENT_TIMESTAMP WHERE id = %s", (session_id,))
-            
+            while cursor.nextset():
+                pass
+
             conn.commit()
+            self._invalidate_session_caches(session_id)
         except Exception as e:
             logger.error(f"Failed to add message to session {session_id}: {e}")
         finally:
             if conn:
                 conn.close()
 
+    def add_messages(self, session_id: str, msgs: List[tuple]):
+        """批量添加消息记录 (一次 executemany + 一次 commit)
+
+        一轮 ReAct 迭代会连续产生多条消息 (thought/tool/tool_response...),
+        攒成一批写入把 N 次往返 + N 次 fsync 压缩为 1 次。
+
+        Args:
+            msgs: (role, content, metadata) 三元组列表
+        """
+        if not msgs:
+            return
+        conn = None
+        try:
+            conn = self._get_connection(self.db_name)
+            cursor = conn.cursor()
+
+            rows = [
+                (session_id, role, content,
+                 _meta_dumps(metadata) if metadata else None)
+                for role, content, metadata in msgs
+            ]
+            # pymysql 将 executemany 改写为多行 VALUES, 整批一条语句下发
+            cursor.executemany(self._SQL_INSERT_MESSAGE, rows)
+            cursor.execute(self._SQL_TOUCH_SESSION, (session_id,))
+            conn.commit()
+            self._invalidate_session_caches(session_id)
+        except Exception as e:
+            logger.error(f"Failed to add messages to session {session_id}: {e}")
+        finally:
+            if conn:
+                conn.close()
+
     def list_sessions(self, limit: int = 50) -> List[Dict[str, Any]]:
         """列出最近会话"""
+        cached = self._cache_get(self._list_cache, limit)
+        if cached is not None:
+            return cached
+
         conn = None
         try:
             conn = self._get_connection(self.db_name)
             cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT * FROM sessions ORDER BY updated_at DESC LIMIT %s",
-                (limit,)
-            )
-            
+
+            cursor.execute(self._SQL_LIST_SESSIONS, (limit,))
+
             rows = cursor.fetchall()
             
             for row in rows:
@@ -205,7 +353,9 @@ class SessionManager:
                     row['updated_at'] = row['updated_at'].isoformat()
                 if isinstance(row.get('created_at'), datetime):
                     row['created_at'] = row['created_at'].isoformat()
-                    
+
+            self._cache_put(self._list_cache, limit, rows,
+                            self._LIST_CACHE_TTL, self._LIST_CACHE_SIZE)
             return rows
         except Exception as e:
             logger.error(f"Failed to list sessions: {e}")
@@ -214,31 +364,46 @@ class SessionManager:
             if conn:
                 conn.close()
 
-    def get_session_history(self, session_id: str) -> List[Dict[str, Any]]:
-        """获取会话完整历史"""
+    def get_session_history(self, session_id: str, limit: int = 200,
+                            before_id: int = None) -> List[Dict[str, Any]]:
+        """获取会话历史 (键集分页)
+
+        默认只取最近 limit 条; 传 before_id 向前翻页 (取 id 更小的一批),
+        避免长会话把全部 LONGTEXT 内容一次拖过网络。
+        """
+        cache_key = (session_id, limit, before_id)
+        cached = self._cache_get(self._hist_cache, cache_key)
+        if cached is not None:
+            return cached
+
         conn = None
         try:
             conn = self._get_connection(self.db_name)
             cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT * FROM messages WHERE session_id = %s ORDER BY id ASC",
-                (session_id,)
-            )
-            
-            rows = cursor.fetchall()
+
+            if before_id is None:
+                cursor.execute(self._SQL_SESSION_HISTORY, (session_id, limit))
+            else:
+                cursor.execute(self._SQL_SESSION_HISTORY_BEFORE, (session_id, before_id, limit))
+
+            # 倒序取最近 N 条后翻回时间正序返回
+            rows = list(cursor.fetchall())
+            rows.reverse()
             
             history = []
             for row in rows:
                 msg = dict(row)
+                # 新版 pymysql 可能已把 JSON 列解码为 dict, 先短路
                 if msg.get('metadata'):
                     if isinstance(msg['metadata'], str):
                          try:
-                             msg['metadata'] = json.loads(msg['metadata'])
-                         except:
+                             msg['metadata'] = _meta_loads(msg['metadata'])
+                         except Exception:
                              msg['metadata'] = {}
                 history.append(msg)
-            
+
+            self._cache_put(self._hist_cache, cache_key, history,
+                            self._HIST_CACHE_TTL, self._HIST_CACHE_SIZE)
             return history
         except Exception as e:
             logger.error(f"Failed to get history for session {session_id}: {e}")
@@ -247,6 +412,36 @@ class SessionManager:
             if conn:
                 conn.close()
 
+    def iter_session_history(self, session_id: str):
+        """流式遍历会话全量历史 (服务端游标, 常数内存)
+
+        SSDictCursor 逐行从服务器取回, 不把几 MB 的 LONGTEXT 全量
+        缓冲进内存; 适合导出/流式响应。普通 UI 读取仍走
+        get_session_history 的分页。
+        """
+        conn = None
+        try:
+            conn = self._get_connection(self.db_name)
+            cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            cursor.execute(
+                "SELECT id, role, content, metadata, timestamp FROM messages "
+                "WHERE session_id = %s ORDER BY id ASC",
+                (session_id,)
+            )
+            for row in cursor:
+                msg = dict(row)
+                if msg.get('metadata') and isinstance(msg['metadata'], str):
+                    try:
+                        msg['metadata'] = _meta_loads(msg['metadata'])
+                    except Exception:
+                        msg['metadata'] = {}
+                yield msg
+        except Exception as e:
+            logger.error(f"Failed to stream history for session {session_id}: {e}")
+        finally:
+            if conn:
+                conn.close()
+
     def delete_session(self, session_id: str):
         """删除会话"""
         conn = None
@@ -255,6 +450,7 @@ class SessionManager:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM sessions WHERE id = %s", (session_id,))
             conn.commit()
+            self._invalidate_session_caches(session_id)
         except Exception as e:
             logger.error(f"Failed to delete session {session_id}: {e}")
         finally:
@@ -270,11 +466,8 @@ class SessionManager:
             conn = self._get_connection(self.db_name)
             cursor = conn.cursor()
             
-            cursor.execute(
-                "INSERT INTO research_tasks (task_id, question, status) VALUES (%s, %s, %s)",
-                (task_id, question, status)
-            )
-            
+            cursor.execute(self._SQL_INSERT_TASK, (task_id, question, status))
+
             conn.commit()
         except Exception as e:
             logger.error(f"Failed to create research task: {e}")
@@ -282,6 +475,28 @@ class SessionManager:
             if conn:
                 conn.close()
 
+    def create_research_tasks_bulk(self, tasks: List[tuple]):
+        """批量创建研究任务
+
+        Args:
+            tasks: (task_id, question, status) 元组列表, 单条多行 INSERT 一次落库
+        """
+        if not tasks:
+            return
+        conn = None
+        try:
+            conn = self._get_connection(self.db_name)
+            cursor = conn.cursor()
+
+            cursor.executemany(self._SQL_INSERT_TASK, tasks)
+
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to bulk create research tasks: {e}")
+        finally:
+            if conn:
+                conn.close()
+
     def delete_research_task(self, task_id: str):
         """删除研究任务"""
         conn = None
@@ -325,6 +540,81 @@ class SessionManager:
             if conn:
                 conn.close()
 
+    def upsert_research_task(self, task_id: str, **fields):
+        """幂等写入研究任务 (单条 ON DUPLICATE KEY UPDATE)
+
+        任务不存在则插入, 已存在则只更新传入字段; 调用方不必再走
+        create + update 两次往返。
+        """
+        if not fields:
+            return
+        conn = None
+        try:
+            conn = self._get_connection(self.db_name)
+            cursor = conn.cursor()
+
+            cols = list(fields)
+            col_list = ", ".join(cols)
+            placeholders = ", ".join(["%s"] * (len(cols) + 1))
+            updates = ", ".join(f"{c} = VALUES({c})" for c in cols)
+            sql = (f"INSERT INTO research_tasks (task_id, {col_list}) "
+                   f"VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {updates}")
+
+            cursor.execute(sql, (task_id, *fields.values()))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to upsert research task {task_id}: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def update_research_tasks(self, batch: Dict[str, Dict[str, Any]]):
+        """批量更新研究任务 (单条 CASE WHEN 语句一次更新多行)
+
+        并发 worker 同时推进多个任务时, 攒成一批把 N 次 UPDATE 往返
+        压缩为 1 次。
+
+        Args:
+            batch: task_id → {字段: 新值} 映射
+        """
+        if not batch:
+            return
+        if len(batch) == 1:
+            task_id, update_data = next(iter(batch.items()))
+            self.update_research_task(task_id, update_data)
+            return
+
+        conn = None
+        try:
+            conn = self._get_connection(self.db_name)
+            cursor = conn.cursor()
+
+            # 每个字段一段 CASE task_id WHEN ... END; 未涉及该字段的
+            # 行由 ELSE 保持原值
+            fields = sorted({k for update_data in batch.values() for k in update_data})
+            set_parts = []
+            values = []
+            for field in fields:
+                cases = []
+                for task_id, update_data in batch.items():
+                    if field in update_data:
+                        cases.append("WHEN %s THEN %s")
+                        values.extend((task_id, update_data[field]))
+                set_parts.append(f"{field} = CASE task_id {' '.join(cases)} ELSE {field} END")
+
+            ids = list(batch)
+            placeholders = ", ".join(["%s"] * len(ids))
+            sql = (f"UPDATE research_tasks SET {', '.join(set_parts)} "
+                   f"WHERE task_id IN ({placeholders})")
+
+            cursor.execute(sql, tuple(values) + tuple(ids))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to bulk update research tasks: {e}")
+        finally:
+            if conn:
+                conn.close()
+
     def get_research_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """获取单个任务详情"""
         conn = None
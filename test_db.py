@@ -1,9 +1,10 @@
 
 import os
-import pymysql
 from dotenv import load_dotenv
 import time
 
+from src.utils.db_pool import get_pooled_connection, DBUTILS_AVAILABLE
+
 load_dotenv()
 
 host = os.getenv("DB_HOST")
@@ -12,27 +13,37 @@ password = os.getenv("DB_PASSWORD")
 db_name = os.getenv("DB_NAME")
 port = int(os.getenv("DB_PORT", 3306))
 
-print(f"Connecting to {host}:{port} user={user} db={db_name}...")
+print(f"Connecting to {host}:{port} user={user} db={db_name} (pooled={DBUTILS_AVAILABLE})...")
 
 try:
+    # 走与应用相同的连接池路径, 诊断结果才能反映线上行为
     start = time.time()
-    conn = pymysql.connect(
-        host=host,
-        port=port,
-        user=user,
-        password=password,
-        database=db_name,
-        connect_timeout=10
-    )
+    conn = get_pooled_connection(host, port, user, password, db_name)
     print(f"Connected in {time.time() - start:.2f}s")
-    
+
+    # COM_PING 单包探活 (比 SELECT 1 还省一次语句解析)
+    start = time.time()
+    conn.ping(reconnect=True)
+    print(f"Ping OK in {time.time() - start:.4f}s")
+
+    # COUNT(*) 在 MVCC 下要遍历索引, 诊断只需常数时间的往返计时;
+    # 行数从 information_schema 取近似值即可
     cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM research_tasks")
+    start = time.time()
+    cursor.execute("SELECT 1")
+    cursor.fetchone()
+    print(f"SELECT 1 round-trip in {time.time() - start:.4f}s")
+
+    cursor.execute(
+        "SELECT table_rows FROM information_schema.tables "
+        "WHERE table_schema = %s AND table_name = 'research_tasks'",
+        (db_name,)
+    )
     result = cursor.fetchone()
-    print(f"Research Tasks Count: {result}")
-    
+    print(f"Research Tasks Count (approx): {result}")
+
     conn.close()
-    print("Connection closed.")
+    print("Connection returned to pool.")
 
 except Exception as e:
     print(f"Connection failed: {e}")
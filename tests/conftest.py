@@ -0,0 +1,18 @@
+"""pytest 共享 fixture"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def app():
+    """整个 pytest 会话共享同一个 FastAPI 应用"""
+    from src.api.main import app as a
+    return a
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    """会话级测试客户端: lifespan 启停在整个套件中只各执行一次"""
+    with TestClient(app) as c:
+        yield c
@@ -1,14 +1,10 @@
 """IntentClarifier 测试"""
 
 import pytest
-import sys
-import os
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 from dataclasses import dataclass
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 from src.agent.intent_clarifier import IntentClarifier, ClarificationDirection, ClarificationResult
 
 
@@ -1,10 +1,6 @@
 """Agent 测试"""
 
 import pytest
-import sys
-import os
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.agent import xSmartReactAgent, ResearchResult
 from src.tools import BaseTool
@@ -1,10 +1,6 @@
 """高级研究 API 端点测试"""
 
 import pytest
-import sys
-import os
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 
 def get_test_client():
@@ -1,23 +1,11 @@
 """API 测试"""
 
 import pytest
-import sys
-import os
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
-from fastapi.testclient import TestClient
 
 
 class TestHealthEndpoint:
     """健康检查端点测试"""
-    
-    @pytest.fixture
-    def client(self):
-        """创建测试客户端"""
-        from src.api.main import app
-        return TestClient(app)
-    
+
     def test_health_check(self, client):
         """测试健康检查"""
         response = client.get("/health")
@@ -40,13 +28,7 @@ class TestHealthEndpoint:
 
 class TestResearchEndpoint:
     """研究端点测试"""
-    
-    @pytest.fixture
-    def client(self):
-        """创建测试客户端"""
-        from src.api.main import app
-        return TestClient(app)
-    
+
     def test_research_request_validation(self, client):
         """测试请求验证"""
         # 空问题应该失败
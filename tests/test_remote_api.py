@@ -17,6 +17,7 @@ Usage:
 import argparse
 import asyncio
 import json
+import os
 import sys
 import time
 from datetime import datetime
@@ -27,6 +28,13 @@ except ImportError:
     print("Please install httpx first: pip install httpx")
     sys.exit(1)
 
+# SSE 事件解码优先走 orjson (C 扩展), 未安装时退回标准库
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
 # ── Config ───────────────────────────────────────────────
 DEFAULT_HOST = "https://xsmartdeepresearch.fusionxlink.com"
 DEFAULT_QUESTION = "Python 3.13 has what new features? List 3 briefly"
@@ -39,109 +47,205 @@ DIM = "\033[90m"
 BOLD = "\033[1m"
 RESET = "\033[0m"
 
+# 非终端 (CI 日志/重定向) 或 NO_COLOR 约定生效时关掉彩色:
+# 省下每行的转义序列字节和拼接开销
+_TTY = sys.stdout.isatty() and os.environ.get("NO_COLOR") is None
+if not _TTY:
+    GREEN = RED = YELLOW = CYAN = DIM = BOLD = RESET = ""
+
+
+# ── pytest 集成 ──────────────────────────────────────────
+# 设 XSDR_REMOTE_TEST=1 才对真实服务跑, 平时 collect 为 skip;
+# 直接 python 执行走 __main__, 不依赖 pytest
+try:
+    import pytest
+    import pytest_asyncio
+
+    pytestmark = [
+        pytest.mark.asyncio(loop_scope="session"),
+        pytest.mark.skipif(
+            not os.environ.get("XSDR_REMOTE_TEST"),
+            reason="remote integration test: set XSDR_REMOTE_TEST=1 to enable",
+        ),
+    ]
+
+    @pytest_asyncio.fixture(scope="session", loop_scope="session")
+    async def client():
+        """全模块共享一个长连接客户端 (覆盖 conftest 的 TestClient)"""
+        async with httpx.AsyncClient(
+            base_url=os.environ.get("REMOTE_HOST", DEFAULT_HOST),
+            verify=False,
+            timeout=httpx.Timeout(300, connect=10),
+            limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=30),
+        ) as c:
+            yield c
+
+    @pytest.fixture(scope="session")
+    def question():
+        return os.environ.get("REMOTE_QUESTION", DEFAULT_QUESTION)
+except ImportError:
+    pass
+
+
+# 状态行前缀在 import 时拼好 (TTY 判定之后), 每行只剩一次拼接
+_OK = "  " + GREEN + "PASS" + RESET + "  "
+_FAIL = "  " + RED + "FAIL" + RESET + "  "
+_DIM_L = "  " + DIM
+_HEADER_BAR = "=" * 60
 
 def ok(msg):
-    print("  " + GREEN + "PASS" + RESET + "  " + msg)
+    print(_OK + msg)
 
 def fail(msg):
-    print("  " + RED + "FAIL" + RESET + "  " + msg)
+    print(_FAIL + msg)
 
 def dim(msg):
-    print("  " + DIM + msg + RESET)
+    print(_DIM_L + msg + RESET)
 
 def header(title):
-    print("\n" + "=" * 60)
+    print("\n" + _HEADER_BAR)
     print("  " + BOLD + title + RESET)
-    print("=" * 60)
+    print(_HEADER_BAR)
 
 
 # ── Test 1: Health ───────────────────────────────────────
-async def test_health(base_url, question):
+async def test_health(client, question):
     header("Test 1: Health Check")
     try:
-        async with httpx.AsyncClient(verify=False, timeout=10) as client:
-            resp = await client.get(base_url + "/health")
-            data = resp.json()
-            if resp.status_code == 200:
-                ok("GET /health -> " + str(resp.status_code))
-            else:
-                fail("GET /health -> " + str(resp.status_code))
-            status = data.get("status", "unknown")
-            if status == "healthy":
-                ok("status: " + status)
-            else:
-                fail("status: " + status)
-            dim("version: %s, model: %s" % (data.get("version"), data.get("model")))
+        # 两个探针互相独立, 并发发出: 同一 keep-alive 连接上省一个 RTT
+        resp, resp2 = await asyncio.gather(
+            client.get("/health", timeout=10),
+            client.get("/api/health", timeout=10),
+        )
+        data = resp.json()
+        if resp.status_code == 200:
+            ok("GET /health -> " + str(resp.status_code))
+        else:
+            fail("GET /health -> " + str(resp.status_code))
+        status = data.get("status", "unknown")
+        if status == "healthy":
+            ok("status: " + status)
+        else:
+            fail("status: " + status)
+        dim("version: %s, model: %s" % (data.get("version"), data.get("model")))
 
-            resp2 = await client.get(base_url + "/api/health")
-            if resp2.status_code == 200:
-                ok("GET /api/health -> " + str(resp2.status_code))
-            else:
-                fail("GET /api/health -> " + str(resp2.status_code))
+        if resp2.status_code == 200:
+            ok("GET /api/health -> " + str(resp2.status_code))
+        else:
+            fail("GET /api/health -> " + str(resp2.status_code))
 
-            return resp.status_code == 200
+        return resp.status_code == 200
     except Exception as e:
         fail("Health check failed: " + str(e))
         return False
 
 
 # ── Test 2: SSE Stream ───────────────────────────────────
-async def test_stream(base_url, question):
+# 事件打印按类型查表分发, 替代热循环里的 8 路 if/elif;
+# 字面量键由编译器自动驻留, 字典探测即指针比较。
+# 彩色前缀预拼接, 每事件单次 write, 每 16 个事件 flush 一次
+_P_TASK_CREATED = "    " + DIM + "[task_created] task_id="
+_P_STATUS = "    " + CYAN + "[status]" + RESET + " "
+_P_THINK = "    " + YELLOW + "[think]" + RESET + " "
+_P_TOOL_START = "    " + GREEN + "[tool_start]" + RESET + " "
+_P_TOOL_RESPONSE = "    " + GREEN + "[tool_response]" + RESET + " "
+_P_ANSWER = "    " + BOLD + "[answer]" + RESET + " "
+_P_FINAL = "    " + GREEN + "[final_answer]" + RESET + " "
+_P_ERROR = "    " + RED + "[error]" + RESET + " "
+_OUT = sys.stdout
+_FLUSH_EVERY = 16
+
+def _on_task_created(event, content, preview, state):
+    _OUT.write(_P_TASK_CREATED + str(event.get("task_id")) + RESET + "\n")
+
+def _on_status(event, content, preview, state):
+    _OUT.write(_P_STATUS + preview + "\n")
+
+def _on_think(event, content, preview, state):
+    _OUT.write(_P_THINK + preview[:60] + "...\n")
+
+def _on_tool_start(event, content, preview, state):
+    _OUT.write(_P_TOOL_START + str(event.get("tool", "?")) + "\n")
+
+def _on_tool_response(event, content, preview, state):
+    _OUT.write(_P_TOOL_RESPONSE + "%s (%d chars)\n" % (event.get("tool", "?"), len(content)))
+
+def _on_answer(event, content, preview, state):
+    _OUT.write(_P_ANSWER + preview[:60] + "...\n")
+
+def _on_final_answer(event, content, preview, state):
+    state["final_answer"] = content
+    _OUT.write(_P_FINAL + "iterations=%s, termination=%s\n"
+               % (event.get("iterations", "?"), event.get("termination", "?")))
+
+def _on_error(event, content, preview, state):
+    _OUT.write(_P_ERROR + preview + "\n")
+
+_SSE_HANDLERS = {
+    "task_created": _on_task_created,
+    "status": _on_status,
+    "think": _on_think,
+    "tool_start": _on_tool_start,
+    "tool_response": _on_tool_response,
+    "answer": _on_answer,
+    "final_answer": _on_final_answer,
+    "error": _on_error,
+}
+
+
+async def test_stream(client, question):
     header("Test 2: SSE Stream Research")
     dim("Question: " + question)
     print()
 
     event_counts = {}
-    final_answer = None
+    state = {"final_answer": None}
     t0 = time.time()
 
     try:
-        async with httpx.AsyncClient(verify=False, timeout=300) as client:
-            async with client.stream(
-                "POST",
-                base_url + "/api/v1/research/stream",
-                json={"question": question, "max_iterations": 5},
-            ) as response:
-                if response.status_code == 200:
-                    ok("POST /api/v1/research/stream -> 200")
-                else:
-                    fail("POST /api/v1/research/stream -> " + str(response.status_code))
-                    return False
+        # client.stream 的上下文只管理响应体, 客户端连接继续复用
+        async with client.stream(
+            "POST",
+            "/api/v1/research/stream",
+            json={"question": question, "max_iterations": 5},
+        ) as response:
+            if response.status_code == 200:
+                ok("POST /api/v1/research/stream -> 200")
+            else:
+                fail("POST /api/v1/research/stream -> " + str(response.status_code))
+                return False
 
-                async for line in response.aiter_lines():
-                    if not line.startswith("data: "):
+            # 手工按字节切帧: SSE 只需找 b"\n" 边界 + b"data: " 前缀,
+            # 跳过 aiter_lines 对每个 chunk 的整体 UTF-8 解码
+            buf = bytearray()
+            async for chunk in response.aiter_bytes():
+                buf += chunk
+                while True:
+                    i = buf.find(b"\n")
+                    if i < 0:
+                        break
+                    line = bytes(buf[:i])
+                    del buf[:i + 1]
+                    if line[:6] != b"data: ":
                         continue
                     try:
-                        event = json.loads(line[6:])
-                    except json.JSONDecodeError:
+                        event = loads(line[6:])
+                    except ValueError:
                         continue
 
-                    etype = event.get("type", "unknown")
+                    # 热循环里条件表达式比 .get 少一层方法调用
+                    etype = event["type"] if "type" in event else "unknown"
                     event_counts[etype] = event_counts.get(etype, 0) + 1
-                    content = event.get("content", "")
+                    content = event["content"] if "content" in event else ""
                     preview = content[:80].replace("\n", " ") if content else ""
 
-                    if etype == "task_created":
-                        print("    " + DIM + "[task_created] task_id=" + str(event.get("task_id")) + RESET)
-                    elif etype == "status":
-                        print("    " + CYAN + "[status]" + RESET + " " + preview)
-                    elif etype == "think":
-                        print("    " + YELLOW + "[think]" + RESET + " " + preview[:60] + "...")
-                    elif etype == "tool_start":
-                        print("    " + GREEN + "[tool_start]" + RESET + " " + str(event.get("tool", "?")))
-                    elif etype == "tool_response":
-                        tool = event.get("tool", "?")
-                        print("    " + GREEN + "[tool_response]" + RESET + " %s (%d chars)" % (tool, len(content)))
-                    elif etype == "answer":
-                        print("    " + BOLD + "[answer]" + RESET + " " + preview[:60] + "...")
-                    elif etype == "final_answer":
-                        final_answer = content
-                        iters = event.get("iterations", "?")
-                        term = event.get("termination", "?")
-                        print("    " + GREEN + "[final_answer]" + RESET + " iterations=%s, termination=%s" % (iters, term))
-                    elif etype == "error":
-                        print("    " + RED + "[error]" + RESET + " " + preview)
+                    handler = _SSE_HANDLERS.get(etype)
+                    if handler:
+                        handler(event, content, preview, state)
+                        if sum(event_counts.values()) % _FLUSH_EVERY == 0:
+                            _OUT.flush()
 
+        _OUT.flush()
         elapsed = time.time() - t0
         print()
         dim("Total time: %.1fs" % elapsed)
@@ -158,6 +262,7 @@ async def test_stream(base_url, question):
         else:
             fail("No status events")
 
+        final_answer = state["final_answer"]
         if final_answer:
             ok("Got final_answer (%d chars)" % len(final_answer))
             print()
@@ -174,55 +279,59 @@ async def test_stream(base_url, question):
 
 
 # ── Test 3: Async + Polling ──────────────────────────────
-async def test_async(base_url, question):
+async def test_async(client, question):
     header("Test 3: Async Research + Polling")
     dim("Question: " + question)
     print()
 
     try:
-        async with httpx.AsyncClient(verify=False, timeout=30) as client:
-            resp = await client.post(
-                base_url + "/api/v1/research/async",
-                json={"question": question, "max_iterations": 3},
-            )
-            data = resp.json()
-            if resp.status_code == 200:
-                ok("POST /api/v1/research/async -> 200")
-            else:
-                fail("POST /api/v1/research/async -> " + str(resp.status_code))
-                return False
+        resp = await client.post(
+            "/api/v1/research/async",
+            json={"question": question, "max_iterations": 3},
+            timeout=30,
+        )
+        data = resp.json()
+        if resp.status_code == 200:
+            ok("POST /api/v1/research/async -> 200")
+        else:
+            fail("POST /api/v1/research/async -> " + str(resp.status_code))
+            return False
 
-            task_id = data.get("task_id")
-            if not task_id:
-                fail("No task_id in response")
-                return False
-            dim("task_id: " + task_id)
-            ok("Task created: " + str(data.get("status")))
-
-            dim("Polling for completion (max 60s)...")
-            for i in range(12):
-                await asyncio.sleep(5)
-                sr = await client.get(base_url + "/api/v1/research/" + task_id + "/status")
-                if sr.status_code == 200:
-                    sd = sr.json()
-                    s = sd.get("status", "unknown")
-                    it = sd.get("current_iteration", "?")
-                    print("    [%ds] status=%s, iteration=%s" % ((i + 1) * 5, s, it))
-                    if s == "completed":
-                        ok("Task completed!")
-                        rr = await client.get(base_url + "/api/v1/research/" + task_id)
-                        answer = rr.json().get("answer", "")
-                        if answer:
-                            ok("Answer received (%d chars)" % len(answer))
-                        else:
-                            fail("Empty answer")
-                        return True
-                    elif s == "failed":
-                        fail("Task failed: " + str(sd.get("termination_reason")))
-                        return False
-
-            fail("Polling timeout (60s)")
+        task_id = data.get("task_id")
+        if not task_id:
+            fail("No task_id in response")
             return False
+        dim("task_id: " + task_id)
+        ok("Task created: " + str(data.get("status")))
+
+        dim("Polling for completion (max 60s)...")
+        # 指数退避: 快任务亚秒级发现完成, 慢任务减少轮询往返
+        delay, total, deadline = 0.5, 0.0, 60.0
+        while total < deadline:
+            await asyncio.sleep(delay)
+            total += delay
+            delay = min(delay * 1.6, 5.0)
+            sr = await client.get("/api/v1/research/" + task_id + "/status", timeout=30)
+            if sr.status_code == 200:
+                sd = sr.json()
+                s = sd.get("status", "unknown")
+                it = sd.get("current_iteration", "?")
+                print("    [%.1fs] status=%s, iteration=%s" % (total, s, it))
+                if s == "completed":
+                    ok("Task completed!")
+                    rr = await client.get("/api/v1/research/" + task_id, timeout=30)
+                    answer = rr.json().get("answer", "")
+                    if answer:
+                        ok("Answer received (%d chars)" % len(answer))
+                    else:
+                        fail("Empty answer")
+                    return True
+                elif s == "failed":
+                    fail("Task failed: " + str(sd.get("termination_reason")))
+                    return False
+
+        fail("Polling timeout (60s)")
+        return False
 
     except Exception as e:
         fail("Async research failed: " + str(e))
@@ -230,7 +339,7 @@ async def test_async(base_url, question):
 
 
 # ── Test 4: Sync ─────────────────────────────────────────
-async def test_sync(base_url, question):
+async def test_sync(client, question):
     header("Test 4: Sync Research (blocking)")
     dim("Question: " + question)
     dim("This may take 30-120 seconds...")
@@ -238,26 +347,25 @@ async def test_sync(base_url, question):
 
     t0 = time.time()
     try:
-        async with httpx.AsyncClient(verify=False, timeout=300) as client:
-            resp = await client.post(
-                base_url + "/api/v1/research",
-                json={"question": question, "max_iterations": 3},
-            )
-            elapsed = time.time() - t0
-            data = resp.json()
-            if resp.status_code == 200:
-                ok("POST /api/v1/research -> 200 (%.1fs)" % elapsed)
-            else:
-                fail("POST /api/v1/research -> " + str(resp.status_code))
-            answer = data.get("answer", "")
-            if answer:
-                ok("Answer received (%d chars)" % len(answer))
-                print()
-                print("  " + BOLD + "--- Answer Preview ---" + RESET)
-                print("  " + answer[:300] + "...")
-            else:
-                fail("Empty answer")
-            return resp.status_code == 200 and len(answer) > 0
+        resp = await client.post(
+            "/api/v1/research",
+            json={"question": question, "max_iterations": 3},
+        )
+        elapsed = time.time() - t0
+        data = resp.json()
+        if resp.status_code == 200:
+            ok("POST /api/v1/research -> 200 (%.1fs)" % elapsed)
+        else:
+            fail("POST /api/v1/research -> " + str(resp.status_code))
+        answer = data.get("answer", "")
+        if answer:
+            ok("Answer received (%d chars)" % len(answer))
+            print()
+            print("  " + BOLD + "--- Answer Preview ---" + RESET)
+            print("  " + answer[:300] + "...")
+        else:
+            fail("Empty answer")
+        return resp.status_code == 200 and len(answer) > 0
 
     except httpx.ReadTimeout:
         fail("Request timed out (300s)")
@@ -268,26 +376,25 @@ async def test_sync(base_url, question):
 
 
 # ── Test 5: History ──────────────────────────────────────
-async def test_history(base_url, question):
+async def test_history(client, question):
     header("Test 5: Research History")
     try:
-        async with httpx.AsyncClient(verify=False, timeout=10) as client:
-            resp = await client.get(base_url + "/api/v1/research/history")
-            data = resp.json()
-            if resp.status_code == 200:
-                ok("GET /api/v1/research/history -> 200")
-            else:
-                fail("GET /api/v1/research/history -> " + str(resp.status_code))
-            if isinstance(data, list):
-                ok("History is list: %d items" % len(data))
-                if data:
-                    latest = data[0]
-                    s = latest.get("status", "?")
-                    q = latest.get("question", "")[:50]
-                    dim("Latest: [%s] %s..." % (s, q))
-            else:
-                fail("History is not a list")
-            return resp.status_code == 200
+        resp = await client.get("/api/v1/research/history", timeout=10)
+        data = resp.json()
+        if resp.status_code == 200:
+            ok("GET /api/v1/research/history -> 200")
+        else:
+            fail("GET /api/v1/research/history -> " + str(resp.status_code))
+        if isinstance(data, list):
+            ok("History is list: %d items" % len(data))
+            if data:
+                latest = data[0]
+                s = latest.get("status", "?")
+                q = latest.get("question", "")[:50]
+                dim("Latest: [%s] %s..." % (s, q))
+        else:
+            fail("History is not a list")
+        return resp.status_code == 200
     except Exception as e:
         fail("History failed: " + str(e))
         return False
@@ -308,7 +415,12 @@ async def main():
     parser.add_argument("--host", default=DEFAULT_HOST, help="API base URL")
     parser.add_argument("--test", choices=list(TEST_MAP.keys()), help="Run specific test")
     parser.add_argument("--question", default=DEFAULT_QUESTION, help="Test question")
+    parser.add_argument("--parallel", action=argparse.BooleanOptionalAction, default=None,
+                        help="Run tests concurrently (default: yes for the default suite)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Launch N concurrent streams (only with --test stream)")
     args = parser.parse_args()
+    concurrency = max(1, args.concurrency)
 
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print()
@@ -317,23 +429,63 @@ async def main():
     dim("Time:   " + now_str)
 
     if args.test:
-        tests = {args.test: TEST_MAP[args.test]}
+        selected = [(args.test, TEST_MAP[args.test])]
     else:
-        tests = {"health": test_health, "stream": test_stream, "history": test_history}
-
-    results = {}
-    for name, fn in tests.items():
-        try:
-            results[name] = await fn(args.host, args.question)
-        except KeyboardInterrupt:
-            print("\n  " + YELLOW + "Interrupted" + RESET)
-            results[name] = False
-            break
+        selected = [("health", test_health), ("stream", test_stream),
+                    ("history", test_history)]
+
+    # (名字, 结果) 对列表: 插入序即汇总序, 汇总时不再过一遍 dict
+    results = []
+    # 全部测试共享一个长连接客户端: 只握一次 TCP+TLS,
+    # 轮询/多次请求都走 keep-alive 复用同一 socket
+    async with httpx.AsyncClient(
+        base_url=args.host,
+        verify=False,
+        timeout=httpx.Timeout(300, connect=10),
+        # 连接上限跟着 --concurrency 走, 避免压测时撞 httpx 默认池上限
+        limits=httpx.Limits(
+            max_connections=max(20, concurrency * 2),
+            max_keepalive_connections=max(20, concurrency),
+            keepalive_expiry=30,
+        ),
+        transport=httpx.AsyncHTTPTransport(retries=1, verify=False),
+    ) as client:
+        # 压测模式: N 路并发 stream, 信号量限流后整批 gather
+        if concurrency > 1 and args.test == "stream":
+            sem = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with sem:
+                    return await test_stream(client, args.question)
+
+            values = await asyncio.gather(
+                *(one() for _ in range(concurrency)), return_exceptions=True
+            )
+            results.append(("stream", all(v is True for v in values)))
+            selected = []
+        # 默认套件并发跑: health/history 是独立幂等 GET,
+        # 与耗时的 stream 重叠执行 (代价是输出交错)
+        parallel = args.parallel if args.parallel is not None else (args.test is None)
+        if parallel and len(selected) > 1:
+            values = await asyncio.gather(
+                *(fn(client, args.question) for _, fn in selected),
+                return_exceptions=True,
+            )
+            for (name, _), value in zip(selected, values):
+                results.append((name, value is True))
+        else:
+            for name, fn in selected:
+                try:
+                    results.append((name, await fn(client, args.question)))
+                except KeyboardInterrupt:
+                    print("\n  " + YELLOW + "Interrupted" + RESET)
+                    results.append((name, False))
+                    break
 
     # Summary
     header("Test Summary")
     passed = 0
-    for name, p in results.items():
+    for name, p in results:
         icon = GREEN + "PASS" + RESET if p else RED + "FAIL" + RESET
         print("  [%s] %s" % (icon, name))
         if p:
@@ -347,4 +499,10 @@ async def main():
 
 
 if __name__ == "__main__":
+    # 装了 uvloop 就用 C 级事件循环跑 SSE 消费, 没装走默认循环
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     sys.exit(asyncio.run(main()))
@@ -1,25 +1,35 @@
-from src.utils.session_manager import SessionManager
-from src.utils.logger import logger
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
+_DB_HOST = os.getenv("DB_HOST")
 
-def test_connection():
+
+@lru_cache(maxsize=1)
+def _session_manager():
+    """延迟且只构造一次: SessionManager 的导入链 (pymysql/DBUtils) 较重"""
+    from src.utils.session_manager import SessionManager
+    return SessionManager()
+
+
+def test_connection(sm=None):
+    """用已构造的 SessionManager 跑一遍建/查/删 (连接复用自进程池)"""
     try:
-        print(f"Testing connection to {os.getenv('DB_HOST')}...")
-        sm = SessionManager()
+        print(f"Testing connection to {_DB_HOST}...")
+        if sm is None:
+            sm = _session_manager()
         print("✅ SessionManager Initialized (DB & Tables checked).")
-        
+
         print("Creating test session...")
         sid = sm.create_session("Test Remote Session", "test")
         if sid:
             print(f"✅ Session Created: {sid}")
-            
+
             print("Listing sessions...")
             sessions = sm.list_sessions(limit=5)
             print(f"✅ Recently created sessions: {[s['id'] for s in sessions]}")
-            
+
             print("Cleaning up...")
             sm.delete_session(sid)
             print("✅ Cleanup done.")
@@ -27,10 +37,11 @@ def test_connection():
         else:
             print("❌ Failed to create session.")
             return False
-            
+
     except Exception as e:
         print(f"❌ Error: {e}")
         return False
 
 if __name__ == "__main__":
-    test_connection()
+    # 构造一次, 后续操作借同一连接池; 不再隐式靠 GC 收尾
+    test_connection(_session_manager())